@@ -0,0 +1,373 @@
+//
+// Python bindings for the C skipsort engine
+//
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+
+#include "fastsort.h"
+#include "skiplist.h"
+
+/* signature shared by the typed sorts, up to the return value */
+typedef long long (*SortFunction)(void *data, size_t N, SkipsortType type);
+
+static long long sortDataSteps(void *data, size_t N, SkipsortType type) {
+    return sortDataTyped(data, N, type);
+}
+
+/** Finds the element type of a buffer
+ *
+ * The struct format of a buffer can be prefixed with a byte order character,
+ * which we accept as long as it describes the native byte order. Integer
+ * formats are told apart by their item size, since the size of `l` depends
+ * on the platform.
+ *
+ * @param view Buffer to check
+ * @param [out] type Element type of the buffer
+ * @return 1 if the buffer can be sorted as an array of type, 0 otherwise
+ */
+static int bufferType(const Py_buffer *view, SkipsortType *type) {
+    const char *format = view->format ? view->format : "B";
+    const int one = 1;
+    const char native = *(const char *)&one ? '<' : '>';
+
+    if(*format == '@' || *format == '=' || *format == native) {
+        ++format;
+    }
+
+    if(format[0] == '\0' || format[1] != '\0') {
+        return 0;
+    }
+
+    switch(format[0]) {
+        case 'i': case 'l': case 'q': case 'n':
+            if(view->itemsize == 4) {
+                *type = SKIPSORT_INT32;
+                return 1;
+            }
+            if(view->itemsize == 8) {
+                *type = SKIPSORT_INT64;
+                return 1;
+            }
+            return 0;
+        case 'f':
+            *type = SKIPSORT_FLOAT;
+            return view->itemsize == sizeof(float);
+        case 'd':
+            *type = SKIPSORT_DOUBLE;
+            return view->itemsize == sizeof(double);
+        default:
+            return 0;
+    }
+}
+
+/** Sorts a writable, C-contiguous buffer of 32 or 64-bit signed ints, floats or doubles
+ * in place without copying it
+ *
+ * @return The step count returned by the sort, or -1 with an exception set
+ */
+static long long sortBuffer(PyObject *obj, SortFunction sort) {
+    Py_buffer view;
+    SkipsortType type;
+    long long steps;
+
+    if(PyObject_GetBuffer(obj, &view, PyBUF_WRITABLE | PyBUF_FORMAT | PyBUF_C_CONTIGUOUS) < 0) {
+        return -1;
+    }
+
+    if(!bufferType(&view, &type)) {
+        PyErr_Format(PyExc_TypeError,
+                     "expected a buffer of 32 or 64-bit signed ints, floats or doubles, "
+                     "got format '%s' with itemsize %zd",
+                     view.format ? view.format : "B", view.itemsize);
+        PyBuffer_Release(&view);
+        return -1;
+    }
+
+    /* the sort doesn't touch any Python object, so other threads can run meanwhile */
+    Py_BEGIN_ALLOW_THREADS
+    steps = sort(view.buf, (size_t)(view.len / view.itemsize), type);
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&view);
+
+    if(steps < 0) {
+        PyErr_NoMemory();
+    }
+
+    return steps;
+}
+
+/** Sorts a list by converting it to a C array in a single pass,
+ * and writing the sorted values back into the same list
+ *
+ * Lists starting with a float are sorted as doubles, every other list
+ * as 64-bit ints.
+ *
+ * @return The step count returned by the sort, or -1 with an exception set
+ */
+static long long sortList(PyObject *list, SortFunction sort) {
+    Py_ssize_t i, n = PyList_GET_SIZE(list);
+    SkipsortType type = SKIPSORT_INT64;
+    int64_t *ints;
+    double *doubles;
+    void *data;
+    long long steps;
+
+    /* every item has to have the same exact type, since they all come back as that type. Ints above 2^53
+     * would lose precision as doubles, and bools or other subclasses would come back as plain ints */
+    if(n > 0 && PyFloat_CheckExact(PyList_GET_ITEM(list, 0))) {
+        type = SKIPSORT_DOUBLE;
+    }
+
+    for(i = 0; i < n; ++i) {
+        PyObject *item = PyList_GET_ITEM(list, i);
+
+        if(type == SKIPSORT_DOUBLE ? !PyFloat_CheckExact(item) : !PyLong_CheckExact(item)) {
+            PyErr_Format(PyExc_TypeError, "list item %zd has type %s, but the list can only be made of %s",
+                         i, Py_TYPE(item)->tp_name, type == SKIPSORT_DOUBLE ? "floats" : "ints");
+            return -1;
+        }
+    }
+
+    data = PyMem_Malloc(8 * (n ? n : 1));
+
+    if(data == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    ints = data;
+    doubles = data;
+
+    for(i = 0; i < n; ++i) {
+        PyObject *item = PyList_GET_ITEM(list, i);
+
+        if(type == SKIPSORT_DOUBLE) {
+            doubles[i] = PyFloat_AsDouble(item);
+
+            if(doubles[i] == -1.0 && PyErr_Occurred()) {
+                PyMem_Free(data);
+                return -1;
+            }
+
+            if(doubles[i] != doubles[i]) {
+                PyErr_Format(PyExc_ValueError, "list item %zd is NaN, which can't be sorted", i);
+                PyMem_Free(data);
+                return -1;
+            }
+        } else {
+            long long value = PyLong_AsLongLong(item);
+
+            if(value == -1 && PyErr_Occurred()) {
+                PyMem_Free(data);
+                return -1;
+            }
+
+            ints[i] = value;
+        }
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    steps = sort(data, (size_t)n, type);
+    Py_END_ALLOW_THREADS
+
+    if(steps < 0) {
+        PyMem_Free(data);
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    /* another thread may have resized the list while the GIL was released */
+    if(PyList_GET_SIZE(list) != n) {
+        PyErr_SetString(PyExc_RuntimeError, "list changed size during sort");
+        PyMem_Free(data);
+        return -1;
+    }
+
+    for(i = 0; i < n; ++i) {
+        PyObject *value = type == SKIPSORT_DOUBLE ? PyFloat_FromDouble(doubles[i])
+                                                  : PyLong_FromLongLong(ints[i]);
+
+        /* steals the reference to value, and releases the old item, whose destructor could shrink the list */
+        if(value == NULL || PyList_SetItem(list, i, value) < 0) {
+            PyMem_Free(data);
+            return -1;
+        }
+    }
+
+    PyMem_Free(data);
+    return steps;
+}
+
+static long long sortObject(PyObject *obj, SortFunction sort) {
+    if(PyList_Check(obj)) {
+        return sortList(obj, sort);
+    }
+
+    if(PyObject_CheckBuffer(obj)) {
+        return sortBuffer(obj, sort);
+    }
+
+    PyErr_Format(PyExc_TypeError, "expected a list or a writable buffer of numbers, got %s",
+                 Py_TYPE(obj)->tp_name);
+    return -1;
+}
+
+static PyObject *cfastsort_skipSortOptimized(PyObject *self, PyObject *obj) {
+    long long steps = sortObject(obj, skipSortOptimizedTyped);
+
+    if(steps < 0) {
+        return NULL;
+    }
+
+    return PyLong_FromLongLong(steps);
+}
+
+static PyObject *cfastsort_skipSortCompacted(PyObject *self, PyObject *obj) {
+    long long steps = sortObject(obj, skipSortCompactedTyped);
+
+    if(steps < 0) {
+        return NULL;
+    }
+
+    return PyLong_FromLongLong(steps);
+}
+
+static PyObject *cfastsort_skipSortUnrolled(PyObject *self, PyObject *obj) {
+    long long steps = sortObject(obj, skipSortUnrolledTyped);
+
+    if(steps < 0) {
+        return NULL;
+    }
+
+    return PyLong_FromLongLong(steps);
+}
+
+static PyObject *cfastsort_sortData(PyObject *self, PyObject *obj) {
+    if(sortObject(obj, sortDataSteps) < 0) {
+        return NULL;
+    }
+
+    Py_RETURN_NONE;
+}
+
+#ifdef SKIPLIST_INSTRUMENT
+
+/* builds a list out of the first n counters of a histogram */
+static PyObject *histogramToList(const unsigned long long *histogram, Py_ssize_t n) {
+    PyObject *list = PyList_New(n);
+    Py_ssize_t i;
+
+    if(list == NULL) {
+        return NULL;
+    }
+
+    for(i = 0; i < n; ++i) {
+        PyObject *value = PyLong_FromUnsignedLongLong(histogram[i]);
+
+        if(value == NULL) {
+            Py_DECREF(list);
+            return NULL;
+        }
+
+        PyList_SET_ITEM(list, i, value);
+    }
+
+    return list;
+}
+
+static PyObject *cfastsort_getStats(PyObject *self, PyObject *unused) {
+    struct skiplistStats stats;
+
+    skiplistGetTotalStats(&stats);
+
+    return Py_BuildValue("{s:K,s:K,s:N,s:N,s:N,s:N,s:N}",
+                         "inserts", stats.inserts,
+                         "hits", stats.hits,
+                         "level_steps", histogramToList(stats.levelSteps, SKIPLIST_MAX_HEIGHT),
+                         "steps", histogramToList(stats.steps, SKIPLIST_STEPS_BUCKETS),
+                         "tower_heights", histogramToList(stats.towerHeights, SKIPLIST_MAX_HEIGHT + 1),
+                         "hit_heights", histogramToList(stats.hitHeights, SKIPLIST_MAX_HEIGHT + 1),
+                         "list_heights", histogramToList(stats.listHeights, SKIPLIST_MAX_HEIGHT + 1));
+}
+
+static PyObject *cfastsort_resetStats(PyObject *self, PyObject *unused) {
+    skiplistResetTotalStats();
+    Py_RETURN_NONE;
+}
+
+#else
+
+static PyObject *cfastsort_getStats(PyObject *self, PyObject *unused) {
+    PyErr_SetString(PyExc_RuntimeError,
+                    "cfastsort was built without instrumentation, rebuild it with SKIPLIST_INSTRUMENT=1 set");
+    return NULL;
+}
+
+static PyObject *cfastsort_resetStats(PyObject *self, PyObject *unused) {
+    return cfastsort_getStats(self, unused);
+}
+
+#endif
+
+static PyMethodDef cfastsortMethods[] = {
+    {"skipSortOptimized", cfastsort_skipSortOptimized, METH_O,
+     "skipSortOptimized(data)\n--\n\n"
+     "Sorts data in place with the optimized C skipsort, and returns the number of steps it performed.\n"
+     "data can be a list of ints or floats, or any writable C-contiguous buffer of 32 or 64-bit\n"
+     "signed ints, floats or doubles, such as array('q') or a numpy float64 array, which is sorted\n"
+     "without being copied. A list has to be made only of floats, which are sorted as doubles,\n"
+     "or only of ints, which are sorted as 64-bit ints, and anything else raises TypeError."},
+    {"skipSortCompacted", cfastsort_skipSortCompacted, METH_O,
+     "skipSortCompacted(data)\n--\n\n"
+     "Same as skipSortOptimized, except that the skiplist nodes are laid out in key order\n"
+     "before the output pass. Accepts the same data as skipSortOptimized."},
+    {"skipSortUnrolled", cfastsort_skipSortUnrolled, METH_O,
+     "skipSortUnrolled(data)\n--\n\n"
+     "Same as skipSortOptimized, except that the keys are kept in an unrolled skiplist, whose nodes\n"
+     "hold blocks of up to 8 sorted keys. Accepts the same data as skipSortOptimized."},
+    {"sortData", cfastsort_sortData, METH_O,
+     "sortData(data)\n--\n\n"
+     "Sorts data in place with the original C skipsort, which searches and inserts separately.\n"
+     "Accepts the same data as skipSortOptimized."},
+    {"getStats", cfastsort_getStats, METH_NOARGS,
+     "getStats()\n--\n\n"
+     "Returns the histograms kept by skiplistSafeInsert over every sort since the last resetStats(), as a dict:\n"
+     "inserts and hits count the keys that created a node or incremented one, level_steps the forward steps\n"
+     "taken at each level, steps the calls by number of steps, and tower_heights, hit_heights and\n"
+     "list_heights the new nodes, the nodes hit and the list after each call, by height.\n"
+     "Only available when cfastsort was built with SKIPLIST_INSTRUMENT=1, see INSTRUMENTED."},
+    {"resetStats", cfastsort_resetStats, METH_NOARGS,
+     "resetStats()\n--\n\n"
+     "Clears the histograms returned by getStats()."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef cfastsortModule = {
+    PyModuleDef_HEAD_INIT,
+    "cfastsort",
+    "Bindings for the C skipsort engine in fastsort.c",
+    -1,
+    cfastsortMethods
+};
+
+PyMODINIT_FUNC PyInit_cfastsort(void) {
+    PyObject *module = PyModule_Create(&cfastsortModule);
+
+    if(module == NULL) {
+        return NULL;
+    }
+
+#ifdef SKIPLIST_INSTRUMENT
+    if(PyModule_AddIntConstant(module, "INSTRUMENTED", 1) < 0) {
+#else
+    if(PyModule_AddIntConstant(module, "INSTRUMENTED", 0) < 0) {
+#endif
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    return module;
+}
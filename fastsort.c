@@ -4,77 +4,449 @@
 
 #include <stddef.h>
 #include <stdlib.h>
+#include <string.h>
+#include <pthread.h>
 #include "fastsort.h"
 #include "skiplist.h"
+#include "unrolledskiplist.h"
 
 
+/* floats are ordered by their bit patterns once the magnitude bits of negative values
+ * are flipped, and the same flip maps them back */
+static inline int32_t flipFloatBits(int32_t bits) {
+    return bits < 0 ? bits ^ INT32_MAX : bits;
+}
+
+static inline int64_t flipDoubleBits(int64_t bits) {
+    return bits < 0 ? bits ^ INT64_MAX : bits;
+}
+
+/* reads data[i] as a skiplist key that orders the same way as the element */
+static inline SkiplistKey loadKey(const void *data, size_t i, SkipsortType type) {
+    int32_t bits32;
+    int64_t bits64;
+
+    switch(type) {
+        case SKIPSORT_INT32:
+            return ((const int32_t *)data)[i];
+        case SKIPSORT_INT64:
+            return ((const int64_t *)data)[i];
+        case SKIPSORT_FLOAT:
+            memcpy(&bits32, (const float *)data + i, sizeof(bits32));
+            return flipFloatBits(bits32);
+        case SKIPSORT_DOUBLE:
+        default:
+            memcpy(&bits64, (const double *)data + i, sizeof(bits64));
+            return flipDoubleBits(bits64);
+    }
+}
+
+/* writes count copies of the element that key was loaded from, starting at data[k] */
+static inline void storeKey(void *data, size_t k, size_t count, SkiplistKey key, SkipsortType type) {
+    size_t i;
+    int32_t bits32;
+    int64_t bits64;
+    float f;
+    double d;
+
+    switch(type) {
+        case SKIPSORT_INT32:
+            for(i = k; i < k + count; ++i) {
+                ((int32_t *)data)[i] = (int32_t)key;
+            }
+            break;
+        case SKIPSORT_INT64:
+            for(i = k; i < k + count; ++i) {
+                ((int64_t *)data)[i] = key;
+            }
+            break;
+        case SKIPSORT_FLOAT:
+            bits32 = flipFloatBits((int32_t)key);
+            memcpy(&f, &bits32, sizeof(f));
+            for(i = k; i < k + count; ++i) {
+                ((float *)data)[i] = f;
+            }
+            break;
+        case SKIPSORT_DOUBLE:
+            bits64 = flipDoubleBits(key);
+            memcpy(&d, &bits64, sizeof(d));
+            for(i = k; i < k + count; ++i) {
+                ((double *)data)[i] = d;
+            }
+            break;
+    }
+}
+
+/* writes the keys of slist back into data in order from data[k] on,
+ * each as many times as it was counted */
+static void writeBack(Skiplist slist, void *data, size_t k, SkipsortType type) {
+    /* k is the running index of the entire data loop, which goes up to k + N-1 */
+    Skiplist iter = slist;
+
+    /* here we set the pointer from the head to the first element pointer
+     * and we proceed to check whether or not iter is NULL. If iter is NULL,
+     * we have arrived at the end of the list, and the entire data array is re-populated
+     * */
+    while((iter = iter->next[0]) != NULL) {
+        storeKey(data, k, iter->count, iter->key, type);
+        k += iter->count;
+    }
+}
+
 /* sorts the data */
-void sortData(int *data, int N) {
+int sortDataTyped(void *data, size_t N, SkipsortType type) {
 
     Skiplist slist = skiplistCreate();
+    SkiplistKey key;
+    bool found;
+
+    if(slist == NULL) {
+        return -1;
+    }
 
     /* Go through the entire dataset */
-    for(register int i = 0; i < N; ++i) {
+    for(register size_t i = 0; i < N; ++i) {
+        key = loadKey(data, i, type);
 
         /* if the data member is already inside the skiplist, it'll be incremented
          * automatically. Otherwise, a separate insertion routine is called */
-        if(skiplistSearch(slist, data[i], 1) != data[i]) {
+        if(key == SKIPLIST_KEY_MIN) {
+            /* the head has the same key, so the search can't tell it apart from the smallest key */
+            found = slist->next[0] && slist->next[0]->key == key;
+
+            if(found) {
+                slist->next[0]->count++;
+            }
+        } else {
+            found = skiplistSearch(slist, key, 1) == key;
+        }
+
+        if(!found) {
             /* I don't like this separation between the search function
              * and the insertion function*/
-            skiplistInsert(slist, data[i]);
+            if(skiplistInsert(slist, key) < 0) {
+                skiplistDestroy(slist);
+                return -1;
+            }
         }
     }
 
-    /* k is the running index of the entire data loop, which goes from 0 to N-1
-     * i is the index which we use to actually access the data array and we use
-     * i to loop from k to k + d, where d is the duplicate count of a single member
-     */
-    int k = 0, i = 0;
-    /* here we set the pointer from the head to the first element pointer
-     * and we proceed to check whether or not slist is NULL. If slist is NULL,
-     * we have arrived at the end of the list, and the entire data array is re-populated
-     * */
-    while((slist = slist->next[0]) != NULL) {
-
-        for(i = k; i < k+slist -> count; ++i) {
-            data[i] = slist->key;
-        }
+    writeBack(slist, data, 0, type);
 
-        k=i;
-    }
-    /* destroy the skiplist */
+    /* destroy the skiplist, starting from the head so that every node is freed */
     skiplistDestroy(slist);
+
+    return 0;
 }
 
-int skipSortOptimized(int *data, int N) {
+int sortData(int *data, int N) {
+    return sortDataTyped(data, N > 0 ? (size_t)N : 0, SKIPSORT_INT32);
+}
+
+/* skipsorts the data, compacting the skiplist before the output pass if asked to */
+static long long skipSort(void *data, size_t N, SkipsortType type, bool compact) {
     Skiplist slist = skiplistCreate();
 
-    register int i;
+    register size_t i;
+
+    long long total_steps = 0;
+    int steps;
+
+    if(slist == NULL) {
+        return -1;
+    }
 
-    int total_steps = 0;
     /* go through the dataset */
     for(i = 0; i < N; ++i) {
         /* insert/increment the data member at data[i] within the skiplist*/
-        total_steps += skiplistSafeInsert(slist, data[i]);
+        steps = skiplistSafeInsert(slist, loadKey(data, i, type));
 
-    }
+        if(steps < 0) {
+            skiplistDestroy(slist);
+            return -1;
+        }
 
-    /* try and put k on the register */
-    register int k = 0;
-    while((slist = slist->next[0]) != NULL) {
+        total_steps += steps;
+    }
 
-        /* put the value from the skiplist back into the data array, list->count times*/
-        for(i = k; i < k+slist->count; ++i){
-            data[i] = slist->key;
-        }
-        k = i;
+    /* lay the nodes out in key order, so that the output pass reads memory sequentially.
+     * If there isn't enough memory for it, the nodes are simply left where they are */
+    if(compact) {
+        skiplistCompact(slist);
     }
 
+    writeBack(slist, data, 0, type);
+
     /* Destroy the skiplist */
     skiplistDestroy(slist);
 
     /* N total steps performed during the last while loop */
-    return total_steps + N;
+    return total_steps + (long long)N;
+}
+
+long long skipSortOptimizedTyped(void *data, size_t N, SkipsortType type) {
+    return skipSort(data, N, type, 0);
+}
+
+long long skipSortCompactedTyped(void *data, size_t N, SkipsortType type) {
+    return skipSort(data, N, type, 1);
+}
+
+/* skipsorts the data with an unrolled skiplist, whose nodes hold blocks of keys */
+long long skipSortUnrolledTyped(void *data, size_t N, SkipsortType type) {
+    UnrolledSkiplist slist;
+    struct unrolledBlock *block;
+    long long total_steps = 0;
+    size_t i, k = 0;
+    int steps, j;
+
+    /* the 32-bit counts of the blocks could overflow, the classic skiplist has room for any count */
+    if(N > UNROLLED_MAX_COUNT) {
+        return skipSortOptimizedTyped(data, N, type);
+    }
+
+    slist = unrolledSkiplistCreate();
+
+    if(slist == NULL) {
+        return -1;
+    }
+
+    for(i = 0; i < N; ++i) {
+        steps = unrolledSkiplistSafeInsert(slist, loadKey(data, i, type));
+
+        if(steps < 0) {
+            unrolledSkiplistDestroy(slist);
+            return -1;
+        }
+
+        total_steps += steps;
+    }
+
+    for(block = slist->head->next[0]; block; block = block->next[0]) {
+        for(j = 0; j < block->used; ++j) {
+            storeKey(data, k, block->counts[j], block->keys[j], type);
+            k += block->counts[j];
+        }
+    }
+
+    unrolledSkiplistDestroy(slist);
+
+    /* N total steps performed during the output pass */
+    return total_steps + (long long)N;
+}
+
+long long skipSortUnrolled(int *data, int N) {
+    return skipSortUnrolledTyped(data, N > 0 ? (size_t)N : 0, SKIPSORT_INT32);
+}
+
+long long skipSortOptimized(int *data, int N) {
+    return skipSort(data, N > 0 ? (size_t)N : 0, SKIPSORT_INT32, 0);
+}
+
+long long skipSortCompacted(int *data, int N) {
+    return skipSort(data, N > 0 ? (size_t)N : 0, SKIPSORT_INT32, 1);
+}
+
+
+/* number of samples taken per bucket when choosing the splitters */
+#define PARALLEL_OVERSAMPLING 64
+
+/* below this many elements per thread, starting the threads costs more than it saves */
+#define PARALLEL_MIN_BUCKET 4096
+
+/* a bucket of keys that gets sorted into its own skiplist by one thread */
+struct skipSortBucket {
+    const SkiplistKey *keys;
+    size_t start;   /* index of the first key of the bucket, in keys and in the output */
+    size_t N;       /* number of keys in the bucket */
+    void *data;
+    SkipsortType type;
+    Skiplist slist;
+    long long steps;
+};
+
+static int compareKeys(const void *a, const void *b) {
+    SkiplistKey x = *(const SkiplistKey *)a, y = *(const SkiplistKey *)b;
+    return (x > y) - (x < y);
+}
+
+/* index of the bucket holding key, which is the first splitter that is >= key */
+static inline int findBucket(const SkiplistKey *splitters, int num_splitters, SkiplistKey key) {
+    int low = 0, high = num_splitters;
+
+    while(low < high) {
+        int mid = (low + high) / 2;
+
+        if(splitters[mid] < key) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+
+    return low;
+}
+
+/* builds the skiplist of a bucket, leaving slist NULL if out of memory */
+static void *sortBucket(void *arg) {
+    struct skipSortBucket *bucket = arg;
+    size_t i;
+    int steps;
+
+    bucket->steps = 0;
+    bucket->slist = skiplistCreate();
+
+    if(bucket->slist == NULL) {
+        return NULL;
+    }
+
+    for(i = 0; i < bucket->N; ++i) {
+        steps = skiplistSafeInsert(bucket->slist, bucket->keys[bucket->start + i]);
+
+        if(steps < 0) {
+            skiplistDestroy(bucket->slist);
+            bucket->slist = NULL;
+            return NULL;
+        }
+
+        bucket->steps += steps;
+    }
+
+    return NULL;
+}
+
+/* writes the skiplist of a bucket into its slice of the output, and frees it */
+static void *writeBucket(void *arg) {
+    struct skipSortBucket *bucket = arg;
+
+    writeBack(bucket->slist, bucket->data, bucket->start, bucket->type);
+    skiplistDestroy(bucket->slist);
+    bucket->slist = NULL;
+
+    return NULL;
+}
+
+/* runs routine on every bucket, one thread per bucket. A bucket whose thread
+ * can't be started is handled by the calling thread instead */
+static void runBuckets(struct skipSortBucket *buckets, int num_buckets, void *(*routine)(void *)) {
+    pthread_t *threads = malloc(sizeof(pthread_t) * num_buckets);
+    bool *started = calloc(num_buckets, sizeof(bool));
+    int b;
+
+    for(b = 0; b < num_buckets; ++b) {
+        if(threads && started && pthread_create(&threads[b], NULL, routine, &buckets[b]) == 0) {
+            started[b] = 1;
+        } else {
+            routine(&buckets[b]);
+        }
+    }
+
+    for(b = 0; b < num_buckets; ++b) {
+        if(started && started[b]) {
+            pthread_join(threads[b], NULL);
+        }
+    }
+
+    free(threads);
+    free(started);
+}
+
+long long skipSortParallel(void *data, size_t N, SkipsortType type, int threads) {
+    SkiplistKey *keys = NULL, *sample = NULL, splitters[SKIPSORT_MAX_THREADS];
+    struct skipSortBucket *buckets = NULL;
+    size_t *offsets = NULL;
+    size_t i, num_samples;
+    long long total_steps = -1;
+    int b, num_splitters;
+    bool out_of_memory = 0;
+
+    if(threads > SKIPSORT_MAX_THREADS) {
+        threads = SKIPSORT_MAX_THREADS;
+    }
+
+    /* small inputs aren't worth splitting up */
+    if(threads <= 1 || N < (size_t)threads * PARALLEL_MIN_BUCKET) {
+        return skipSort(data, N, type, 0);
+    }
+
+    num_splitters = threads - 1;
+    num_samples = (size_t)threads * PARALLEL_OVERSAMPLING;
+
+    keys = malloc(sizeof(SkiplistKey) * N);
+    sample = malloc(sizeof(SkiplistKey) * num_samples);
+    buckets = calloc(threads, sizeof(struct skipSortBucket));
+    offsets = calloc(threads, sizeof(size_t));
+
+    if(keys == NULL || sample == NULL || buckets == NULL || offsets == NULL) {
+        goto done;
+    }
+
+    /* take evenly spaced samples, and use every PARALLEL_OVERSAMPLING-th one of them as a splitter */
+    for(i = 0; i < num_samples; ++i) {
+        sample[i] = loadKey(data, i * (N / num_samples), type);
+    }
+
+    qsort(sample, num_samples, sizeof(SkiplistKey), compareKeys);
+
+    for(b = 0; b < num_splitters; ++b) {
+        splitters[b] = sample[(b + 1) * PARALLEL_OVERSAMPLING];
+    }
+
+    /* count the keys of each bucket, so that every bucket gets a contiguous slice of keys */
+    for(i = 0; i < N; ++i) {
+        ++offsets[findBucket(splitters, num_splitters, loadKey(data, i, type))];
+    }
+
+    for(b = 0, i = 0; b < threads; ++b) {
+        buckets[b].keys = keys;
+        buckets[b].start = i;
+        buckets[b].N = offsets[b];
+        buckets[b].data = data;
+        buckets[b].type = type;
+
+        offsets[b] = i;
+        i += buckets[b].N;
+    }
+
+    /* scatter the keys into their buckets. The buckets are ordered by key range,
+     * so the slice of a bucket in keys is also where its sorted keys end up */
+    for(i = 0; i < N; ++i) {
+        SkiplistKey key = loadKey(data, i, type);
+        keys[offsets[findBucket(splitters, num_splitters, key)]++] = key;
+    }
+
+    runBuckets(buckets, threads, sortBucket);
+
+    /* N total steps performed by the output pass */
+    total_steps = (long long)N;
+
+    for(b = 0; b < threads; ++b) {
+        if(buckets[b].slist == NULL) {
+            out_of_memory = 1;
+        }
+
+        total_steps += buckets[b].steps;
+    }
+
+    /* nothing has been written to data yet, so it can be left untouched if any bucket ran out of memory */
+    if(out_of_memory) {
+        for(b = 0; b < threads; ++b) {
+            skiplistDestroy(buckets[b].slist);
+        }
+
+        total_steps = -1;
+        goto done;
+    }
+
+    runBuckets(buckets, threads, writeBucket);
+
+done:
+    free(keys);
+    free(sample);
+    free(buckets);
+    free(offsets);
+
+    return total_steps;
 }
 
 
@@ -5,6 +5,17 @@
 #ifndef CFASTSORT_FASTSORT_H
 #define CFASTSORT_FASTSORT_H
 
+#include <stddef.h>
+
+/* element types the typed sorts can work on. Every element is mapped onto a
+ * 64-bit skiplist key that orders the same way, floats by their bit patterns */
+typedef enum {
+    SKIPSORT_INT32,
+    SKIPSORT_INT64,
+    SKIPSORT_FLOAT,
+    SKIPSORT_DOUBLE
+} SkipsortType;
+
 /** Sorts the data given using the SkipSort algorithm I devised, with just
  * slightly modified functions provided by James Aspnes in his implementation
  * of a Skiplist.
@@ -19,8 +30,21 @@
  *
  * @param [in,out] data C Pointer to array of integers
  * @param [in] N Number of data members within the data array
+ *
+ * @return 0 on success, -1 if out of memory, in which case data is left untouched
  */
-void sortData(int* data, int N);
+int sortData(int* data, int N);
+
+/** Same as sortData, for an array of any of the SkipsortType element types.
+ * Floating point arrays must not hold NaNs, and -0.0 is ordered before 0.0
+ *
+ * @param [in,out] data C Pointer to array of elements of the given type
+ * @param [in] N Number of data members within the data array
+ * @param [in] type Type of the elements of data
+ *
+ * @return 0 on success, -1 if out of memory, in which case data is left untouched
+ */
+int sortDataTyped(void *data, size_t N, SkipsortType type);
 
 
 /** Sorts the data given using the Skipsort algorithm I devised. This version
@@ -57,9 +81,94 @@ void sortData(int* data, int N);
  * @param [in,out] data C Pointer to array of integers
  * @param [in] N Number of data members within the data array
  *
- * @return Number of steps performed by the algorithm
+ * @return Number of steps performed by the algorithm, or -1 if out of memory,
+ * in which case data is left untouched
+ */
+long long skipSortOptimized(int* data, int N);
+
+/** Same as skipSortOptimized, for an array of any of the SkipsortType element types.
+ * Floating point arrays must not hold NaNs, and -0.0 is ordered before 0.0
+ *
+ * @param [in,out] data C Pointer to array of elements of the given type
+ * @param [in] N Number of data members within the data array
+ * @param [in] type Type of the elements of data
+ *
+ * @return Number of steps performed by the algorithm, or -1 if out of memory
+ */
+long long skipSortOptimizedTyped(void *data, size_t N, SkipsortType type);
+
+/** Same as skipSortOptimized, except that the skiplist gets compacted with
+ * skiplistCompact before the output pass. The nodes are then laid out densely
+ * in key order, so the output pass walks memory sequentially instead of jumping
+ * between nodes in the order they were inserted. This pays off when there are
+ * many distinct keys.
+ *
+ * @param [in,out] data C Pointer to array of integers
+ * @param [in] N Number of data members within the data array
+ *
+ * @return Number of steps performed by the algorithm, or -1 if out of memory
+ */
+long long skipSortCompacted(int* data, int N);
+
+/** Same as skipSortCompacted, for an array of any of the SkipsortType element types.
+ *
+ * @param [in,out] data C Pointer to array of elements of the given type
+ * @param [in] N Number of data members within the data array
+ * @param [in] type Type of the elements of data
+ *
+ * @return Number of steps performed by the algorithm, or -1 if out of memory
+ */
+long long skipSortCompactedTyped(void *data, size_t N, SkipsortType type);
+
+/** Same as skipSortOptimized, except that the keys are kept in an unrolled skiplist,
+ * see unrolledskiplist.h. Its bottom level is made of blocks of up to 8 sorted keys,
+ * and only the blocks carry towers, so most of the pointer chasing of the classic
+ * layout turns into a linear scan through a cache line. Arrays of more than
+ * UNROLLED_MAX_COUNT elements, whose counts might not fit a block, are sorted
+ * by skipSortOptimized instead.
+ *
+ * @param [in,out] data C Pointer to array of integers
+ * @param [in] N Number of data members within the data array
+ *
+ * @return Number of steps performed by the algorithm, or -1 if out of memory,
+ * in which case data is left untouched
+ */
+long long skipSortUnrolled(int* data, int N);
+
+/** Same as skipSortUnrolled, for an array of any of the SkipsortType element types.
+ *
+ * @param [in,out] data C Pointer to array of elements of the given type
+ * @param [in] N Number of data members within the data array
+ * @param [in] type Type of the elements of data
+ *
+ * @return Number of steps performed by the algorithm, or -1 if out of memory
+ */
+long long skipSortUnrolledTyped(void *data, size_t N, SkipsortType type);
+
+/* upper bound on the thread count of skipSortParallel */
+#define SKIPSORT_MAX_THREADS 256
+
+/** Parallel version of skipSortOptimizedTyped.
+ *
+ * Evenly spaced samples of the data are sorted to choose threads - 1 splitters,
+ * which cut the key range into one bucket per thread. The keys are then scattered
+ * into their buckets, and every bucket is sorted into its own skiplist on its own
+ * pthread. Since the buckets are ordered by key range, each one is written straight
+ * into its own slice of data, so no merge is needed afterwards.
+ *
+ * The keys are copied into the buckets first, which takes 8 extra bytes per element.
+ * Inputs with fewer than 4096 elements per thread are sorted on the calling thread.
+ * If a thread can't be started, its bucket is sorted on the calling thread instead.
+ *
+ * @param [in,out] data C Pointer to array of elements of the given type
+ * @param [in] N Number of data members within the data array
+ * @param [in] type Type of the elements of data
+ * @param [in] threads Number of threads to sort with, at most SKIPSORT_MAX_THREADS
+ *
+ * @return Number of steps performed by the algorithm, or -1 if out of memory,
+ * in which case data is left untouched
  */
-int skipSortOptimized(int* data, int N);
+long long skipSortParallel(void *data, size_t N, SkipsortType type, int threads);
 
 /** Bubble-sort algorithm for comparing it to the skip-sort algorithm
  *
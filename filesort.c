@@ -0,0 +1,209 @@
+//
+// Sorts binary files of little-endian integers in place, through a memory mapping
+//
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <string.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <time.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/resource.h>
+#include <sys/stat.h>
+#include "fastsort.h"
+
+/*
+ * The skiplist only holds the distinct keys and their counts, so the file never
+ * has to be read into an array: the insert pass reads the records straight out
+ * of the mapping, and the output pass writes them straight back into it. Both
+ * passes go through the file front to back, which the kernel is told about so
+ * that it reads ahead and drops the pages behind.
+ * */
+
+static void usage(const char *program) {
+    fprintf(stderr,
+            "usage: %s [options] FILE\n"
+            "  -t int32|int64   type of the little-endian records of FILE (default int32)\n"
+            "  -o OUTPUT        write the sorted records to OUTPUT, leaving FILE untouched\n"
+            "  -e ENGINE        optimized, unrolled or parallel (default optimized). parallel copies\n"
+            "                   every record into a per-thread bucket first, which takes 8 bytes of\n"
+            "                   memory per record on top of the skiplists\n"
+            "  -j THREADS       threads of the parallel engine (default: number of cores)\n"
+            "  -s               flush the sorted records to disk before exiting\n",
+            program);
+}
+
+/* wall clock time in seconds */
+static double wallTime(void) {
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return now.tv_sec + now.tv_nsec * 1e-9;
+}
+
+/* reverses the bytes of every record, so that little-endian records can be sorted on big-endian machines */
+static void swapBytes(unsigned char *data, size_t N, size_t recordSize) {
+    size_t i, j;
+    unsigned char temp;
+
+    for(i = 0; i < N; ++i, data += recordSize) {
+        for(j = 0; j < recordSize / 2; ++j) {
+            temp = data[j];
+            data[j] = data[recordSize - 1 - j];
+            data[recordSize - 1 - j] = temp;
+        }
+    }
+}
+
+/* maps size bytes of fd, telling the kernel that they'll be accessed front to back */
+static void *mapFile(int fd, size_t size, int protection) {
+    void *map = mmap(NULL, size, protection, MAP_SHARED, fd, 0);
+
+    if(map == MAP_FAILED) {
+        return NULL;
+    }
+
+    madvise(map, size, MADV_SEQUENTIAL);
+
+    return map;
+}
+
+int main(int argc, char **argv) {
+    const char *inputPath, *outputPath = NULL, *engine = "optimized";
+    SkipsortType type = SKIPSORT_INT32;
+    size_t recordSize = 4, size, N;
+    int threads = (int)sysconf(_SC_NPROCESSORS_ONLN), sync = 0, option;
+    int inputFd, outputFd = -1;
+    void *input = NULL, *data = NULL;
+    struct stat inputStat, outputStat;
+    struct rusage resources;
+    const int one = 1;
+    double start, elapsed;
+    long long steps;
+
+    while((option = getopt(argc, argv, "t:o:e:j:sh")) != -1) {
+        switch(option) {
+            case 't':
+                if(strcmp(optarg, "int64") == 0) {
+                    type = SKIPSORT_INT64;
+                    recordSize = 8;
+                } else if(strcmp(optarg, "int32") != 0) {
+                    fprintf(stderr, "unknown record type %s\n", optarg);
+                    return 2;
+                }
+                break;
+            case 'o': outputPath = optarg; break;
+            case 'e': engine = optarg; break;
+            case 'j': threads = atoi(optarg); break;
+            case 's': sync = 1; break;
+            default: usage(argv[0]); return option == 'h' ? 0 : 2;
+        }
+    }
+
+    if(optind != argc - 1 || (strcmp(engine, "optimized") && strcmp(engine, "unrolled") && strcmp(engine, "parallel"))) {
+        usage(argv[0]);
+        return 2;
+    }
+
+    inputPath = argv[optind];
+
+    /* an output file that is the input file itself means sorting in place */
+    if(outputPath && stat(outputPath, &outputStat) == 0 && stat(inputPath, &inputStat) == 0 &&
+       outputStat.st_dev == inputStat.st_dev && outputStat.st_ino == inputStat.st_ino) {
+        outputPath = NULL;
+    }
+
+    if((inputFd = open(inputPath, outputPath ? O_RDONLY : O_RDWR)) < 0 || fstat(inputFd, &inputStat) < 0) {
+        perror(inputPath);
+        return 1;
+    }
+
+    size = (size_t)inputStat.st_size;
+    N = size / recordSize;
+
+    if(size % recordSize) {
+        fprintf(stderr, "%s: size %zu is not a multiple of %zu byte records\n", inputPath, size, recordSize);
+        return 1;
+    }
+
+    if(outputPath) {
+        if((outputFd = open(outputPath, O_RDWR | O_CREAT | O_TRUNC, 0644)) < 0 || ftruncate(outputFd, size) < 0) {
+            perror(outputPath);
+            return 1;
+        }
+    }
+
+    start = wallTime();
+
+    /* mmap can't map empty files, and they're sorted anyway */
+    if(N > 0) {
+        if(outputPath) {
+            input = mapFile(inputFd, size, PROT_READ);
+            data = mapFile(outputFd, size, PROT_READ | PROT_WRITE);
+        } else {
+            data = mapFile(inputFd, size, PROT_READ | PROT_WRITE);
+        }
+
+        if(data == NULL || (outputPath && input == NULL)) {
+            fprintf(stderr, "can't map %s: %s\n", inputPath, strerror(errno));
+            return 1;
+        }
+
+        /* the output file starts out as a copy of the input, which is then sorted in place */
+        if(outputPath) {
+            memcpy(data, input, size);
+            munmap(input, size);
+        }
+
+        if(*(const char *)&one == 0) {
+            swapBytes(data, N, recordSize);
+        }
+
+        if(strcmp(engine, "unrolled") == 0) {
+            steps = skipSortUnrolledTyped(data, N, type);
+        } else if(strcmp(engine, "parallel") == 0) {
+            steps = skipSortParallel(data, N, type, threads);
+        } else {
+            steps = skipSortOptimizedTyped(data, N, type);
+        }
+
+        if(steps < 0) {
+            /* the sorts leave the data untouched when they run out of memory, but the bytes were swapped */
+            if(*(const char *)&one == 0) {
+                swapBytes(data, N, recordSize);
+            }
+
+            fprintf(stderr, "out of memory, %s was left untouched\n", outputPath ? outputPath : inputPath);
+            return 1;
+        }
+
+        if(*(const char *)&one == 0) {
+            swapBytes(data, N, recordSize);
+        }
+
+        if(sync && msync(data, size, MS_SYNC) < 0) {
+            perror("msync");
+            return 1;
+        }
+
+        munmap(data, size);
+    }
+
+    elapsed = wallTime() - start;
+
+    close(inputFd);
+
+    if(outputFd >= 0) {
+        close(outputFd);
+    }
+
+    getrusage(RUSAGE_SELF, &resources);
+
+    /* ru_maxrss is in kilobytes on Linux */
+    fprintf(stderr, "%zu records (%.1f MB) sorted in %.3f secs: %.1f MB/s, %.0f records/s, peak RSS %.1f MB\n",
+            N, size / 1e6, elapsed, size / 1e6 / elapsed, N / elapsed, resources.ru_maxrss / 1024.0);
+
+    return 0;
+}
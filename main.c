@@ -1,116 +1,439 @@
+//
+// Benchmark harness for the C sorts
+//
+
 #include <stdio.h>
 #include <stdlib.h>
-#include <assert.h>
+#include <stdint.h>
+#include <string.h>
+#include <math.h>
 #include <time.h>
+#include <unistd.h>
 #include "fastsort.h"
 #include "skiplist.h"
 
-#define N 50
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
 
-#define printArray(data) for(int i = 0; i < N; ++i) { printf("%d ", data[i]);}
+/* most items taken from a comma-separated option */
+#define MAX_ROWS_PER_LIST 64
 
-void printArrayFunc(int *data, int n) {
+/* number of distinct values in the few-unique distribution */
+#define FEW_UNIQUE 16
 
-    for(register size_t i = 0; i < n; ++i) {
-        printf("%d ", data[i]);
-    }
-    printf("\n");
+/* thread count used by the skipSortParallel engine */
+static int parallelThreads = 1;
+
+/*** ENGINES ***/
+/*
+ * Every engine sorts an int array and returns the number of steps it took,
+ * or -1 if it ran out of memory. Engines that don't count steps return 0.
+ * */
+
+struct engine {
+    const char *name;
+    long long (*sort)(int *data, int n);
+    bool countsSteps;
+    bool parallel;  /* rerun for every thread count when scaling */
+};
+
+static long long sortDataEngine(int *data, int n) {
+    return sortData(data, n) < 0 ? -1 : 0;
+}
+
+static long long parallelEngine(int *data, int n) {
+    return skipSortParallel(data, n, SKIPSORT_INT32, parallelThreads);
+}
+
+static int compareInts(const void *a, const void *b) {
+    int x = *(const int *)a, y = *(const int *)b;
+    return (x > y) - (x < y);
+}
+
+static long long qsortEngine(int *data, int n) {
+    qsort(data, n, sizeof(int), compareInts);
+    return 0;
+}
+
+static long long bubbleEngine(int *data, int n) {
+    bubbleSort(data, n);
+    return 0;
+}
+
+static const struct engine engines[] = {
+    {"sortData", sortDataEngine, 0, 0},
+    {"skipSortOptimized", skipSortOptimized, 1, 0},
+    {"skipSortCompacted", skipSortCompacted, 1, 0},
+    {"skipSortUnrolled", skipSortUnrolled, 1, 0},
+    {"skipSortParallel", parallelEngine, 1, 1},
+    {"qsort", qsortEngine, 0, 0},
+    {"bubbleSort", bubbleEngine, 0, 0},
+};
+
+#define NUM_ENGINES (sizeof(engines) / sizeof(engines[0]))
+
+/* bubbleSort is quadratic, so it only runs when asked for */
+#define DEFAULT_ENGINES "sortData,skipSortOptimized,skipSortCompacted,skipSortUnrolled,skipSortParallel,qsort"
+
+/*** DATASETS ***/
+
+/* splitmix64, so that a seed gives the same datasets everywhere */
+static uint64_t randomNext(uint64_t *state) {
+    uint64_t x = (*state += 0x9E3779B97F4A7C15ULL);
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
 }
 
+/* uniform value in [low, high] */
+static int randomBetween(uint64_t *state, int low, int high) {
+    uint64_t span = (uint64_t)((int64_t)high - low) + 1;
+    return (int)(low + (int64_t)(randomNext(state) % span));
+}
+
+/* uniform double in (0, 1] */
+static double randomUnit(uint64_t *state) {
+    return ((randomNext(state) >> 11) + 1) * (1.0 / 9007199254740992.0);
+}
+
+static const char *distributions[] = {"uniform", "normal", "few-unique", "presorted", "reversed"};
+
+#define NUM_DISTRIBUTIONS (sizeof(distributions) / sizeof(distributions[0]))
 
-int* createRandomArray(int n, int mod) {
-    srand((unsigned)time(0));
-    int *array = malloc(sizeof(int) * n);
+/** Fills data with n values between low and high, drawn from the given distribution
+ *
+ * normal is centered between low and high with a standard deviation of a sixth
+ * of the range, clamped to it. few-unique picks among FEW_UNIQUE uniform values,
+ * presorted and reversed are uniform values sorted either way.
+ *
+ * @return 0 on success, -1 if the distribution is unknown
+ */
+static int fillDataset(int *data, int n, const char *distribution, int low, int high, uint64_t seed) {
+    uint64_t state = seed;
+    int unique[FEW_UNIQUE];
+    int i;
 
-    while(array == NULL) {
-        array = malloc(sizeof(int) * n);
+    if(strcmp(distribution, "normal") == 0) {
+        double mean = ((double)low + high) / 2, deviation = ((double)high - low) / 6;
+
+        for(i = 0; i < n; ++i) {
+            /* Box-Muller */
+            double value = mean + deviation * sqrt(-2 * log(randomUnit(&state)))
+                                            * cos(2 * M_PI * randomUnit(&state));
+
+            data[i] = value < low ? low : value > high ? high : (int)lround(value);
+        }
+
+        return 0;
     }
 
-    for(register size_t i = 0; i < n; ++i) {
-        array[i] = rand() % mod;
+    if(strcmp(distribution, "few-unique") == 0) {
+        for(i = 0; i < FEW_UNIQUE; ++i) {
+            unique[i] = randomBetween(&state, low, high);
+        }
+
+        for(i = 0; i < n; ++i) {
+            data[i] = unique[randomNext(&state) % FEW_UNIQUE];
+        }
+
+        return 0;
     }
-    return array;
-}
 
-void randomizeArray(int *data, int n, int mod) {
-    srand((unsigned)time(0));
-    for(register size_t i = 0; i < n; ++i) {
-        data[i] = rand() % mod;
+    for(i = 0; i < n; ++i) {
+        data[i] = randomBetween(&state, low, high);
+    }
+
+    if(strcmp(distribution, "uniform") == 0) {
+        return 0;
+    }
+
+    if(strcmp(distribution, "presorted") == 0 || strcmp(distribution, "reversed") == 0) {
+        qsort(data, n, sizeof(int), compareInts);
+
+        for(i = 0; distribution[0] == 'r' && i < n / 2; ++i) {
+            int temp = data[i];
+            data[i] = data[n - 1 - i];
+            data[n - 1 - i] = temp;
+        }
+
+        return 0;
     }
+
+    return -1;
 }
 
-void copyArray(int *A, int *B, int n) {
-    for(register size_t i = 0; i < n; ++i) {
-        *B = *A;
+/*** MEASUREMENTS ***/
+
+/* wall clock time in seconds, since clock() adds up the time spent by every thread */
+static double wallTime(void) {
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return now.tv_sec + now.tv_nsec * 1e-9;
+}
+
+static int compareDoubles(const void *a, const void *b) {
+    double x = *(const double *)a, y = *(const double *)b;
+    return (x > y) - (x < y);
+}
+
+static double median(double *values, int n) {
+    qsort(values, n, sizeof(double), compareDoubles);
+    return n % 2 ? values[n / 2] : (values[n / 2 - 1] + values[n / 2]) / 2;
+}
+
+struct result {
+    const char *engine;
+    const char *distribution;
+    int n, low, high, threads, repetitions;
+    double minNsPerElement, medianNsPerElement;
+    double stepsPerElement;  /* negative for engines that don't count steps */
+};
+
+/** Runs an engine warmups + repetitions times on copies of unsorted, and checks every output against sorted
+ *
+ * @return 0 on success, -1 if the engine ran out of memory or sorted incorrectly
+ */
+static int measure(const struct engine *engine, const int *unsorted, const int *sorted, int *data,
+                   int warmups, struct result *result) {
+    int n = result->n, repetitions = result->repetitions, run;
+    double *times = malloc(sizeof(double) * repetitions), *steps = malloc(sizeof(double) * repetitions);
+    double start, elapsed;
+    long long taken;
+
+    if(times == NULL || steps == NULL) {
+        free(times);
+        free(steps);
+        return -1;
     }
+
+    for(run = -warmups; run < repetitions; ++run) {
+        memcpy(data, unsorted, sizeof(int) * n);
+
+        start = wallTime();
+        taken = engine->sort(data, n);
+        elapsed = wallTime() - start;
+
+        if(taken < 0 || memcmp(data, sorted, sizeof(int) * n) != 0) {
+            fprintf(stderr, "%s %s on %d %s elements\n", engine->name,
+                    taken < 0 ? "ran out of memory" : "sorted incorrectly", n, result->distribution);
+            free(times);
+            free(steps);
+            return -1;
+        }
+
+        if(run >= 0) {
+            times[run] = elapsed * 1e9 / (n ? n : 1);
+            steps[run] = (double)taken / (n ? n : 1);
+        }
+    }
+
+    /* median sorts the times, which leaves the fastest one first */
+    result->engine = engine->name;
+    result->medianNsPerElement = median(times, repetitions);
+    result->minNsPerElement = times[0];
+    result->stepsPerElement = engine->countsSteps ? median(steps, repetitions) : -1;
+
+    free(times);
+    free(steps);
+    return 0;
 }
 
-int* arrayCopy(int const *data, int n) {
-    int *copy = malloc(sizeof(int)*n);
+/*** OUTPUT ***/
 
-    while(copy == 0) {
-        copy = malloc(sizeof(int)*n);
+static void writeHeader(FILE *out, bool json) {
+    if(json) {
+        fprintf(out, "[\n");
+    } else {
+        fprintf(out, "engine,distribution,n,low,high,threads,repetitions,"
+                     "min_ns_per_element,median_ns_per_element,steps_per_element\n");
     }
+}
+
+static void writeResult(FILE *out, bool json, bool first, const struct result *r) {
+    if(json) {
+        fprintf(out, "%s  {\"engine\": \"%s\", \"distribution\": \"%s\", \"n\": %d, \"low\": %d, \"high\": %d, "
+                     "\"threads\": %d, \"repetitions\": %d, \"min_ns_per_element\": %.3f, "
+                     "\"median_ns_per_element\": %.3f, ",
+                first ? "" : ",\n", r->engine, r->distribution, r->n, r->low, r->high, r->threads,
+                r->repetitions, r->minNsPerElement, r->medianNsPerElement);
+
+        if(r->stepsPerElement < 0) {
+            fprintf(out, "\"steps_per_element\": null}");
+        } else {
+            fprintf(out, "\"steps_per_element\": %.3f}", r->stepsPerElement);
+        }
+    } else {
+        fprintf(out, "%s,%s,%d,%d,%d,%d,%d,%.3f,%.3f,", r->engine, r->distribution, r->n, r->low, r->high,
+                r->threads, r->repetitions, r->minNsPerElement, r->medianNsPerElement);
+
+        if(r->stepsPerElement >= 0) {
+            fprintf(out, "%.3f", r->stepsPerElement);
+        }
+
+        fprintf(out, "\n");
+    }
+
+    fflush(out);
+}
 
-    for(register size_t i = 0; i < n; ++i) {
-        copy[i] = data[i];
+static void writeFooter(FILE *out, bool json) {
+    if(json) {
+        fprintf(out, "\n]\n");
     }
+}
 
-    return copy;
+/*** COMMAND LINE ***/
+
+static void usage(const char *program) {
+    fprintf(stderr,
+            "usage: %s [options]\n"
+            "  -n N[,N...]        numbers of elements to sort (default 1000,10000,100000,1000000)\n"
+            "  -a LOW             smallest value (default 0)\n"
+            "  -b HIGH            largest value (default 1000000)\n"
+            "  -d DIST[,DIST...]  distributions: uniform, normal, few-unique, presorted, reversed (default uniform)\n"
+            "  -e NAME[,NAME...]  engines: sortData, skipSortOptimized, skipSortCompacted, skipSortUnrolled,\n"
+            "                     skipSortParallel, qsort, bubbleSort (default all but bubbleSort)\n"
+            "  -r COUNT           timed repetitions (default 5)\n"
+            "  -w COUNT           untimed warmup runs before them (default 1)\n"
+            "  -s SEED            seed of the datasets (default 1)\n"
+            "  -t THREADS         threads of skipSortParallel (default: number of cores)\n"
+            "  -S                 run skipSortParallel with every thread count from 1 to THREADS\n"
+            "  -f csv|json        output format (default csv)\n"
+            "  -o FILE            write the results to FILE instead of stdout\n",
+            program);
 }
 
+/* splits a comma-separated list in place, returning the number of items */
+static int splitList(char *list, char **items) {
+    int count = 0;
+    char *item;
 
-void compareSorts(int num_trials, int mod) {
-    clock_t qstart, qdiff, sstart, sdiff;
+    for(item = strtok(list, ","); item && count < MAX_ROWS_PER_LIST; item = strtok(NULL, ",")) {
+        items[count++] = item;
+    }
 
-    long bubble_msec_total = 0, skip_msec_total = 0;
+    return count;
+}
 
-    int *unsorted = createRandomArray(N, mod);
-    int *unsorted_copy = arrayCopy(unsorted, N);
+int main(int argc, char **argv) {
+    char defaultSizes[] = "1000,10000,100000,1000000", defaultDistributions[] = "uniform";
+    char defaultEngines[] = DEFAULT_ENGINES;
+    char *sizeList = defaultSizes, *distributionList = defaultDistributions, *engineList = defaultEngines;
+    char *sizeNames[MAX_ROWS_PER_LIST], *distributionNames[MAX_ROWS_PER_LIST], *engineNames[MAX_ROWS_PER_LIST];
+    const struct engine *selected[MAX_ROWS_PER_LIST];
+    int numSizes, numDistributions, numEngines;
+    int low = 0, high = 1000000, repetitions = 5, warmups = 1, maxThreads = (int)sysconf(_SC_NPROCESSORS_ONLN);
+    uint64_t seed = 1;
+    bool json = 0, scaling = 0, first = 1;
+    const char *outputPath = NULL;
+    FILE *out = stdout;
+    int option, i, j, k, threads, status = 0;
+
+    while((option = getopt(argc, argv, "n:a:b:d:e:r:w:s:t:Sf:o:h")) != -1) {
+        switch(option) {
+            case 'n': sizeList = optarg; break;
+            case 'a': low = atoi(optarg); break;
+            case 'b': high = atoi(optarg); break;
+            case 'd': distributionList = optarg; break;
+            case 'e': engineList = optarg; break;
+            case 'r': repetitions = atoi(optarg); break;
+            case 'w': warmups = atoi(optarg); break;
+            case 's': seed = strtoull(optarg, NULL, 10); break;
+            case 't': maxThreads = atoi(optarg); break;
+            case 'S': scaling = 1; break;
+            case 'f': json = strcmp(optarg, "json") == 0; break;
+            case 'o': outputPath = optarg; break;
+            default: usage(argv[0]); return option == 'h' ? 0 : 2;
+        }
+    }
 
-    for(int trial = 0; trial < num_trials; ++trial) {
+    numSizes = splitList(sizeList, sizeNames);
+    numDistributions = splitList(distributionList, distributionNames);
+    numEngines = splitList(engineList, engineNames);
 
-        qstart = clock();
-        bubbleSort(unsorted, N);
+    if(low > high || repetitions < 1 || warmups < 0 || maxThreads < 1) {
+        fprintf(stderr, "invalid range, repetition, warmup or thread count\n");
+        return 2;
+    }
+
+    for(i = 0; i < numDistributions; ++i) {
+        for(j = 0; j < (int)NUM_DISTRIBUTIONS && strcmp(distributionNames[i], distributions[j]); ++j);
 
-        qdiff = clock() - qstart;
-        bubble_msec_total += (qdiff*1000 / CLOCKS_PER_SEC);
+        if(j == (int)NUM_DISTRIBUTIONS) {
+            fprintf(stderr, "unknown distribution %s\n", distributionNames[i]);
+            return 2;
+        }
+    }
 
-        sstart = clock();
-        sortData(unsorted_copy, N);
-        sdiff = clock() - sstart;
+    for(i = 0; i < numEngines; ++i) {
+        for(j = 0; j < (int)NUM_ENGINES && strcmp(engineNames[i], engines[j].name); ++j);
 
-        skip_msec_total += (sdiff * 1000/ CLOCKS_PER_SEC);
+        if(j == (int)NUM_ENGINES) {
+            fprintf(stderr, "unknown engine %s\n", engineNames[i]);
+            return 2;
+        }
 
-        randomizeArray(unsorted, N, mod);
-        copyArray(unsorted, unsorted_copy, N);
+        selected[i] = &engines[j];
     }
-    free(unsorted);
-    free(unsorted_copy);
-    printf("SkipSort Time: %ld seconds, %ld milliseconds\n", skip_msec_total/1000, skip_msec_total%1000);
-    printf("BubbleSort Time: %ld seconds, %ld milliseconds\n", bubble_msec_total/1000, bubble_msec_total%1000);
 
-    skip_msec_total /= num_trials;
-    bubble_msec_total /= num_trials;
+    if(outputPath && (out = fopen(outputPath, "w")) == NULL) {
+        perror(outputPath);
+        return 1;
+    }
 
-    printf("SkipSort Average: %ld seconds, %ld milliseconds\n", skip_msec_total/1000, skip_msec_total%1000);
-    printf("BubbleSort Average: %ld seconds, %ld milliseconds\n", bubble_msec_total/1000, bubble_msec_total%1000);
+    writeHeader(out, json);
 
+    for(i = 0; i < numSizes && status == 0; ++i) {
+        int n = atoi(sizeNames[i]);
+        int *unsorted = malloc(sizeof(int) * (n ? n : 1));
+        int *sorted = malloc(sizeof(int) * (n ? n : 1));
+        int *data = malloc(sizeof(int) * (n ? n : 1));
 
+        if(n < 0 || unsorted == NULL || sorted == NULL || data == NULL) {
+            fprintf(stderr, "can't allocate %s elements\n", sizeNames[i]);
+            status = 1;
+        }
 
-}
+        for(j = 0; j < numDistributions && status == 0; ++j) {
+            fillDataset(unsorted, n, distributionNames[j], low, high, seed);
+            memcpy(sorted, unsorted, sizeof(int) * n);
+            qsort(sorted, n, sizeof(int), compareInts);
 
-#define REPEAT 10000
-#define MOD 73
+            for(k = 0; k < numEngines && status == 0; ++k) {
+                /* single-threaded engines, and parallel ones when not scaling, only run once */
+                threads = selected[k]->parallel && scaling ? 1 : maxThreads;
 
-int main(void) {
+                for(; threads <= maxThreads && status == 0; ++threads) {
+                    struct result result = {NULL, distributionNames[j], n, low, high,
+                                            selected[k]->parallel ? threads : 1, repetitions, 0, 0, -1};
 
+                    parallelThreads = threads;
 
+                    fprintf(stderr, "%s: %d %s elements, %d thread(s)\n", selected[k]->name, n,
+                            distributionNames[j], result.threads);
 
-    int *randomarray = createRandomArray(N, MOD);
+                    if(measure(selected[k], unsorted, sorted, data, warmups, &result) < 0) {
+                        status = 1;
+                        break;
+                    }
 
-    skipSortOptimized(randomarray, MOD);
-    free(randomarray);
+                    writeResult(out, json, first, &result);
+                    first = 0;
+                }
+            }
+        }
 
-    return 0;
-}
\ No newline at end of file
+        free(unsorted);
+        free(sorted);
+        free(data);
+    }
+
+    writeFooter(out, json);
+
+    if(out != stdout) {
+        fclose(out);
+    }
+
+    return status;
+}
@@ -0,0 +1,15 @@
+import os
+
+from setuptools import setup, Extension
+
+# SKIPLIST_INSTRUMENT=1 python setup.py build_ext --inplace builds the engine with the
+# histograms returned by cfastsort.getStats(), at the cost of slower inserts
+define_macros = [('SKIPLIST_INSTRUMENT', '1')] if os.environ.get('SKIPLIST_INSTRUMENT', '0') != '0' else []
+
+setup(
+    name='cfastsort',
+    description='Python bindings for the C skipsort engine',
+    ext_modules=[Extension('cfastsort', sources=['cfastsortmodule.c', 'fastsort.c', 'skiplist.c', 'unrolledskiplist.c'],
+                           define_macros=define_macros,
+                           extra_compile_args=['-pthread'], extra_link_args=['-pthread'])],
+)
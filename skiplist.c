@@ -1,14 +1,29 @@
 #include <stdlib.h>
+#include <stddef.h>
+#include <string.h>
 #include <assert.h>
 #include <limits.h>
+#include <inttypes.h>
 #include <stdio.h>
+#include <stdatomic.h>
 #include <time.h>
 
 #include "skiplist.h"
+#include "skiplistinternal.h"
 
-#define MAX_HEIGHT (32)
+#define MAX_HEIGHT SKIPLIST_MAX_HEIGHT
 #define BASE_LEVEL 0
 
+/* size of the first slab of an arena, every following slab doubles in size up to SLAB_MAX_SIZE */
+#define SLAB_MIN_SIZE (64 * 1024)
+#define SLAB_MAX_SIZE (16 * 1024 * 1024)
+
+/* number of bytes taken by a node with the given height */
+#define NODE_SIZE(height) (sizeof(struct skiplist) + sizeof(struct skiplist *) * ((height) - 1))
+
+/* number of bytes taken by the header of a list, which holds the head node */
+#define HEADER_SIZE (sizeof(struct skiplistHeader) + sizeof(struct skiplist *) * (MAX_HEIGHT - 1))
+
 /*
  * Most of skiplist.c and skiplist.h was not written by me but was taken from
  * http://www.cs.yale.edu/homes/aspnes/classes/223/examples/trees/skiplist
@@ -17,73 +32,404 @@
  * Both of these files lack in terms of documentation, so I've set out to fix that where needed
  * */
 
-/* choose a height according to a geometric distribution */
-static int
-chooseHeight(void)
-{
-    int i;
-
-    for(i = 1; i < MAX_HEIGHT && rand() % 2 == 0; i++);
-
-    return i;
-}
-
 /*** DEFINITION OF SKIPLIST STRUCT ***/
 /*
 struct skiplist {
-    int key;
-    int count;
+    SkiplistKey key;
+    size_t count;
     int height;                // number of next pointers
     struct skiplist *next[1];  // first of many
 }; */
 
-/* create a skiplist node with the given key and height */
-/* does not fill in next pointers */
-static Skiplist
-skiplistCreateNode(int key, int height)
+/*** NODE ALLOCATION ***/
+/*
+ * Instead of calling malloc once per node, every skiplist owns an arena which
+ * carves the variable-height nodes out of large slabs, one after the other.
+ * Destroying the skiplist releases the slabs rather than each node.
+ *
+ * The arena lives in a header allocated together with the head node, right in
+ * front of it, so the Skiplist handle is still just a pointer to the head.
+ *
+ * Merging and splitting lists moves nodes from one list to another without
+ * copying them, so the slabs of a list go into a reference counted pool, which
+ * stays around for as long as any list holds nodes carved out of it. A list
+ * only ever carves new nodes out of its own pool, the pools it got nodes from
+ * are just kept alive. The structs live in skiplistinternal.h, since the
+ * unrolled skiplist carves its blocks out of the same kind of arena.
+ * */
+
+struct skiplistHeader {
+    struct skiplistArena arena;
+    struct skiplistRandom random;
+#ifdef SKIPLIST_INSTRUMENT
+    struct skiplistStats stats;
+#endif
+    struct skiplist head; /* must stay last, its next pointers extend past the end of the struct */
+};
+
+/* get the header of a skiplist from its head node */
+#define HEADER(s) ((struct skiplistHeader *)((char *)(s) - offsetof(struct skiplistHeader, head)))
+
+/*** INSTRUMENTATION ***/
+/*
+ * Builds defining SKIPLIST_INSTRUMENT keep histograms of what every call to
+ * skiplistSafeInsert did in the header of the list. When a list is destroyed,
+ * its stats are added to the totals, which is where the sorts leave theirs.
+ * Other builds compile the STAT_ macros away.
+ * */
+#ifdef SKIPLIST_INSTRUMENT
+
+#include <pthread.h>
+
+static struct skiplistStats totalStats;
+static pthread_mutex_t totalStatsLock = PTHREAD_MUTEX_INITIALIZER;
+
+/* count a forward step taken at level */
+#define STAT_STEP(s, level) (HEADER(s)->stats.levelSteps[level]++)
+
+/* count a finished call of skiplistSafeInsert on the list with head s */
+#define STAT_INSERT(s, steps, hit, height) recordInsert((s), (steps), (hit), (height))
+
+static void
+recordInsert(Skiplist s, int steps, bool hit, int height)
 {
+    struct skiplistStats *stats = &HEADER(s)->stats;
+
+    if(hit) {
+        stats->hits++;
+        stats->hitHeights[height]++;
+    } else {
+        stats->inserts++;
+        stats->towerHeights[height]++;
+    }
 
-    Skiplist s = NULL;
+    stats->steps[steps < SKIPLIST_STEPS_BUCKETS ? steps : SKIPLIST_STEPS_BUCKETS - 1]++;
+    stats->listHeights[s->height]++;
+}
+
+/* add the stats of s to the totals */
+static void
+addTotalStats(Skiplist s)
+{
+    const unsigned long long *from = (const unsigned long long *)&HEADER(s)->stats;
+    unsigned long long *to = (unsigned long long *)&totalStats;
+    size_t i;
+
+    pthread_mutex_lock(&totalStatsLock);
+
+    /* the stats are nothing but counters */
+    for(i = 0; i < sizeof(struct skiplistStats) / sizeof(unsigned long long); i++) {
+        to[i] += from[i];
+    }
+
+    pthread_mutex_unlock(&totalStatsLock);
+}
+
+void
+skiplistGetStats(Skiplist s, struct skiplistStats *stats)
+{
+    *stats = HEADER(s)->stats;
+}
+
+void
+skiplistGetTotalStats(struct skiplistStats *stats)
+{
+    pthread_mutex_lock(&totalStatsLock);
+    *stats = totalStats;
+    pthread_mutex_unlock(&totalStatsLock);
+}
+
+void
+skiplistResetTotalStats(void)
+{
+    pthread_mutex_lock(&totalStatsLock);
+    memset(&totalStats, 0, sizeof(totalStats));
+    pthread_mutex_unlock(&totalStatsLock);
+}
+
+#else
+
+#define STAT_STEP(s, level) ((void)0)
+#define STAT_INSERT(s, steps, hit, height) ((void)0)
+
+#endif
+
+/*** TOWER HEIGHTS ***/
+/*
+ * Every skiplist has its own generator, so that lists can be used from different
+ * threads at once, and lists created at the same time get different heights.
+ * A node goes up a level with probability 1/base, which is the chance that the
+ * next log2(base) bits of a random number are all zero, so the whole height comes
+ * out of a single 64-bit draw by counting its trailing zeros.
+ * */
+
+/* scrambles a seed, so that nearby seeds give unrelated states */
+static uint64_t
+splitmix64(uint64_t x)
+{
+    x += 0x9E3779B97F4A7C15ULL;
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
+}
+
+void
+skiplistRandomSeed(struct skiplistRandom *random, uint64_t seed, int probabilityBase)
+{
+    random->state = splitmix64(seed);
+
+    /* xorshift gets stuck at 0 */
+    if(random->state == 0) {
+        random->state = 0x9E3779B97F4A7C15ULL;
+    }
+
+    /* the base is rounded down to a power of 2 */
+    for(random->levelBits = 1; probabilityBase >> (random->levelBits + 1); random->levelBits++);
+}
+
+/* choose a height according to a geometric distribution */
+static inline int
+chooseHeight(Skiplist s)
+{
+    return skiplistRandomHeight(&HEADER(s)->random);
+}
+
+/* add a new slab to the arena, big enough to hold at least `size` bytes */
+static struct skiplistSlab *
+arenaAddSlab(struct skiplistArena *arena, size_t size)
+{
+    size_t slabSize = arena->pool && arena->pool->slabs ? arena->pool->slabs->size * 2 : SLAB_MIN_SIZE;
+    struct skiplistSlab *slab;
+
+    if(arena->pool == NULL) {
+        arena->pool = malloc(sizeof(struct skiplistPool));
+
+        if(arena->pool == NULL) {
+            return NULL;
+        }
+
+        atomic_init(&arena->pool->refs, 1);
+        arena->pool->slabs = NULL;
+    }
+
+    if(slabSize > SLAB_MAX_SIZE) {
+        slabSize = SLAB_MAX_SIZE;
+    }
+
+    if(slabSize < size) {
+        slabSize = size;
+    }
+
+    slab = malloc(sizeof(struct skiplistSlab) + slabSize);
+
+    if(slab == NULL) {
+        return NULL;
+    }
+
+    slab->next = arena->pool->slabs;
+    slab->size = slabSize;
+    slab->used = 0;
+
+    arena->pool->slabs = slab;
+    arena->bytesReserved += sizeof(struct skiplistSlab) + slabSize;
+
+    return slab;
+}
+
+/* carve size bytes aligned to align, a power of 2, out of the arena, or return NULL if out of memory */
+void *
+skiplistArenaCarve(struct skiplistArena *arena, size_t size, size_t align)
+{
+    struct skiplistSlab *slab = arena->pool ? arena->pool->slabs : NULL;
+    size_t padding = slab ? (size_t)(-(uintptr_t)(slab->data + slab->used)) & (align - 1) : 0;
+    void *bytes;
+
+    if(slab == NULL || slab->size - slab->used < padding + size) {
+        slab = arenaAddSlab(arena, size + align - 1);
+
+        if(slab == NULL) {
+            return NULL;
+        }
+
+        padding = (size_t)(-(uintptr_t)slab->data) & (align - 1);
+    }
+
+    bytes = slab->data + slab->used + padding;
+    slab->used += padding + size;
+
+    return bytes;
+}
+
+/* drop a reference to a pool, freeing its slabs if it was the last one */
+static void
+poolRelease(struct skiplistPool *pool)
+{
+    struct skiplistSlab *slab, *next;
+
+    if(pool == NULL || atomic_fetch_sub(&pool->refs, 1) > 1) {
+        return;
+    }
+
+    for(slab = pool->slabs; slab; slab = next) {
+        next = slab->next;
+        free(slab);
+    }
+
+    free(pool);
+}
+
+/* whether or not the arena holds on to pool */
+static bool
+arenaHoldsPool(const struct skiplistArena *arena, const struct skiplistPool *pool)
+{
+    const struct skiplistPoolRef *ref;
+
+    if(arena->pool == pool) {
+        return 1;
+    }
+
+    for(ref = arena->borrowed; ref; ref = ref->next) {
+        if(ref->pool == pool) {
+            return 1;
+        }
+    }
+
+    return 0;
+}
+
+/* hand a reference to pool over to the arena, using ref to hold it if the arena doesn't already */
+static void
+arenaBorrowPool(struct skiplistArena *arena, struct skiplistPool *pool, struct skiplistPoolRef *ref)
+{
+    if(pool == NULL || arenaHoldsPool(arena, pool)) {
+        poolRelease(pool);
+        free(ref);
+        return;
+    }
+
+    ref->pool = pool;
+    ref->next = arena->borrowed;
+    arena->borrowed = ref;
+}
+
+/* let go of every pool of the arena, along with the nodes carved out of them */
+void
+skiplistArenaRelease(struct skiplistArena *arena)
+{
+    struct skiplistPoolRef *ref, *next;
+
+    poolRelease(arena->pool);
+
+    for(ref = arena->borrowed; ref; ref = next) {
+        next = ref->next;
+        poolRelease(ref->pool);
+        free(ref);
+    }
+
+    arena->pool = NULL;
+    arena->borrowed = NULL;
+    memset(arena->freed, 0, sizeof(arena->freed));
+}
+
+/* create a skiplist node with the given key and height out of the arena of s */
+/* does not fill in next pointers, returns NULL if no memory is left */
+static Skiplist
+skiplistCreateNode(Skiplist s, SkiplistKey key, int height)
+{
+    struct skiplistArena *arena = &HEADER(s)->arena;
+    Skiplist node = NULL;
 
     assert(height > 0);
     assert(height <= MAX_HEIGHT);
 
-    /* we allocate space for the amount of space needed for one skiplist node object,
-     * that being the key, height and count integers 3*(4Bytes), plus the array of struct skiplist pointers,
-     * with one already insantiated. We also allocate space for the remaining uninstantiated pointers,
-     * represented as (height - 1) skiplist pointers. */
-    size_t memory_usage = sizeof(struct skiplist) + sizeof(struct skiplist *) * (height - 1);
+    /* the size of one skiplist node object, that being the key, height and count integers,
+     * plus the array of struct skiplist pointers, with one already instantiated, and the
+     * remaining (height - 1) pointers */
+    size_t memory_usage = NODE_SIZE(height);
 
-    // printf("Using %lu bits of memory to create a new skiplist node\n", memory_usage);
+    if(arena->freed[height - 1]) {
+        /* reuse a deleted node of the same height */
+        node = arena->freed[height - 1];
+        arena->freed[height - 1] = node->next[0];
+    } else {
+        node = skiplistArenaCarve(arena, memory_usage, sizeof(Skiplist));
+
+        if(node == NULL) {
+            return NULL;
+        }
+    }
 
-    s = malloc(memory_usage);
+    arena->bytesUsed += memory_usage;
 
-    // assert(s);
+    node->key = key;
+    node->count = 1;
+    node->height = height;
 
-    while(s == NULL) {
-        s = malloc(memory_usage);
-    }
+    return node;
+}
 
-    // printf("Initialized a new skiplist node at %p\n\n", s);
+/* give a node back to the arena of s, so that it can be reused */
+static void
+skiplistFreeNode(Skiplist s, Skiplist node)
+{
+    struct skiplistArena *arena = &HEADER(s)->arena;
 
-    s->key = key;
-    s->count = 1;
-    s->height = height;
+    arena->bytesUsed -= NODE_SIZE(node->height);
 
-    return s;
+    node->next[0] = arena->freed[node->height - 1];
+    arena->freed[node->height - 1] = node;
 }
 
-/* create an empty skiplist */
+/* create an empty skiplist, seeded from the clock and from where it lives in memory */
 Skiplist
 skiplistCreate(void)
 {
-    srand((unsigned)time(0));
+    struct timespec now;
+    Skiplist s;
+
+    timespec_get(&now, TIME_UTC);
 
+    s = skiplistCreateSeeded((uint64_t)now.tv_sec * 1000000000ULL + (uint64_t)now.tv_nsec, 2);
+
+    /* lists that exist at the same time live at different addresses */
+    if(s != NULL) {
+        skiplistRandomSeed(&HEADER(s)->random, HEADER(s)->random.state ^ (uintptr_t)s, 2);
+    }
+
+    return s;
+}
+
+/* create an empty skiplist whose tower heights are drawn from the given seed */
+Skiplist
+skiplistCreateSeeded(uint64_t seed, int probabilityBase)
+{
+    struct skiplistHeader *header = NULL;
     Skiplist s = NULL;
     int i;
 
+    /* the header holds the head node, which has room for every level */
+    size_t memory_usage = HEADER_SIZE;
+
+    header = malloc(memory_usage);
+
+    if(header == NULL) {
+        return NULL;
+    }
+
+    memset(&header->arena, 0, sizeof(header->arena));
+    header->arena.bytesUsed = NODE_SIZE(MAX_HEIGHT);
+    header->arena.bytesReserved = memory_usage;
+
+    skiplistRandomSeed(&header->random, seed, probabilityBase);
+
+#ifdef SKIPLIST_INSTRUMENT
+    memset(&header->stats, 0, sizeof(header->stats));
+#endif
+
     /* s is a dummy head element */
-    s = skiplistCreateNode(INT_MIN, MAX_HEIGHT);
+    s = &header->head;
+    s->key = SKIPLIST_KEY_MIN;
+    s->count = 1;
 
     /* this tracks the maximum height of any node.
      *
@@ -99,17 +445,269 @@ skiplistCreate(void)
     return s;
 }
 
-/* free a skiplist */
+/* free a skiplist, all the nodes go away with the slabs of the arena */
 void
 skiplistDestroy(Skiplist s)
 {
-    Skiplist next;
+    if(s) {
+#ifdef SKIPLIST_INSTRUMENT
+        addTotalStats(s);
+#endif
+        skiplistArenaRelease(&HEADER(s)->arena);
+        free(HEADER(s));
+    }
+}
+
+size_t
+skiplistBytesUsed(Skiplist s)
+{
+    return HEADER(s)->arena.bytesUsed;
+}
+
+size_t
+skiplistBytesReserved(Skiplist s)
+{
+    return HEADER(s)->arena.bytesReserved;
+}
+
+int
+skiplistCompact(Skiplist s)
+{
+    struct skiplistArena *arena = &HEADER(s)->arena;
+    struct skiplistArena compacted;
+    Skiplist last[MAX_HEIGHT];
+    Skiplist node, copy;
+    int level;
+
+    if(s->next[0] == NULL) {
+        return 0;
+    }
+
+    /* everything but the head goes into a single slab */
+    memset(&compacted, 0, sizeof(compacted));
+
+    if(arenaAddSlab(&compacted, arena->bytesUsed - NODE_SIZE(MAX_HEIGHT)) == NULL) {
+        poolRelease(compacted.pool);
+        return -1;
+    }
+
+    for(level = 0; level < MAX_HEIGHT; level++) {
+        last[level] = s;
+    }
+
+    /* copy the nodes in key order, relinking every level in the same sweep */
+    for(node = s->next[0]; node; node = node->next[0]) {
+        copy = (Skiplist)(compacted.pool->slabs->data + compacted.pool->slabs->used);
+        compacted.pool->slabs->used += NODE_SIZE(node->height);
+
+        copy->key = node->key;
+        copy->count = node->count;
+        copy->height = node->height;
+
+        for(level = 0; level < node->height; level++) {
+            last[level]->next[level] = copy;
+            last[level] = copy;
+        }
+    }
+
+    for(level = 0; level < s->height; level++) {
+        last[level]->next[level] = NULL;
+    }
+
+    /* the old slabs only hold stale copies now, along with any pool borrowed from other lists */
+    compacted.bytesUsed = arena->bytesUsed;
+    compacted.bytesReserved += HEADER_SIZE;
+    skiplistArenaRelease(arena);
+
+    *arena = compacted;
+
+    return 0;
+}
+
+/* lower the height of the head of s down to its tallest tower */
+static void
+skiplistTrimHeight(Skiplist s)
+{
+    while(s->height > 1 && s->next[s->height - 1] == NULL) {
+        s->height--;
+    }
+}
+
+int
+skiplistMerge(Skiplist s, Skiplist other)
+{
+    struct skiplistArena *arena = &HEADER(s)->arena, *otherArena = &HEADER(other)->arena;
+    struct skiplistPoolRef *ref = NULL, *next;
+    Skiplist last[MAX_HEIGHT], left = s->next[0], right = other->next[0], node, tail;
+    int level;
+
+    /* the only allocation, done up front so that both lists are left untouched without memory */
+    if(otherArena->pool) {
+        ref = malloc(sizeof(struct skiplistPoolRef));
+
+        if(ref == NULL) {
+            return -1;
+        }
+    }
+
+    for(level = 0; level < MAX_HEIGHT; level++) {
+        last[level] = s;
+    }
+
+    /* take the smaller node of either list at each step, relinking every level in the same sweep */
+    while(left || right) {
+        if(right == NULL || (left && left->key < right->key)) {
+            node = left;
+            left = left->next[0];
+        } else if(left == NULL || right->key < left->key) {
+            node = right;
+            right = right->next[0];
+        } else {
+            /* equal keys, the node of other goes back to the free list of s */
+            left->count += right->count;
+            node = right;
+            right = right->next[0];
+
+            skiplistFreeNode(s, node);
+
+            node = left;
+            left = left->next[0];
+        }
+
+        for(level = 0; level < node->height; level++) {
+            last[level]->next[level] = node;
+            last[level] = node;
+        }
+    }
+
+    if(other->height > s->height) {
+        s->height = other->height;
+    }
+
+    for(level = 0; level < s->height; level++) {
+        last[level]->next[level] = NULL;
+    }
+
+    /* the nodes of other stay where they are, so s holds on to its pools */
+    arenaBorrowPool(arena, otherArena->pool, ref);
+
+    for(ref = otherArena->borrowed; ref; ref = next) {
+        next = ref->next;
+        arenaBorrowPool(arena, ref->pool, ref);
+    }
+
+    for(level = 0; level < MAX_HEIGHT; level++) {
+        if(otherArena->freed[level]) {
+            for(tail = otherArena->freed[level]; tail->next[0]; tail = tail->next[0]);
+
+            tail->next[0] = arena->freed[level];
+            arena->freed[level] = otherArena->freed[level];
+        }
+    }
+
+    arena->bytesUsed += otherArena->bytesUsed - NODE_SIZE(MAX_HEIGHT);
+    arena->bytesReserved += otherArena->bytesReserved - HEADER_SIZE;
+
+#ifdef SKIPLIST_INSTRUMENT
+    {
+        const unsigned long long *from = (const unsigned long long *)&HEADER(other)->stats;
+        unsigned long long *to = (unsigned long long *)&HEADER(s)->stats;
+        size_t i;
+
+        for(i = 0; i < sizeof(struct skiplistStats) / sizeof(unsigned long long); i++) {
+            to[i] += from[i];
+        }
+    }
+#endif
+
+    free(HEADER(other));
+
+    return 0;
+}
+
+Skiplist
+skiplistSplit(Skiplist s, SkiplistKey key)
+{
+    struct skiplistArena *arena = &HEADER(s)->arena, *tailArena;
+    struct skiplistPoolRef *refs = NULL, *ref, *next, *borrowed;
+    Skiplist update[MAX_HEIGHT], tail, iter = s, node;
+    int level, pools;
+
+    /* the tail gets its own generator, drawn from the one of s */
+    tail = skiplistCreateSeeded(skiplistRandomNext(&HEADER(s)->random), 2);
+
+    if(tail == NULL) {
+        return NULL;
+    }
+
+    tailArena = &HEADER(tail)->arena;
+    HEADER(tail)->random.levelBits = HEADER(s)->random.levelBits;
+
+    /* the tail holds on to every pool of s, the references are allocated up front
+     * so that s is left untouched without memory */
+    pools = arena->pool ? 1 : 0;
 
-    while(s) {
-        next = s->next[0];
-        free(s);
-        s = next;
+    for(borrowed = arena->borrowed; borrowed; borrowed = borrowed->next) {
+        pools++;
     }
+
+    for(; pools > 0; pools--) {
+        ref = malloc(sizeof(struct skiplistPoolRef));
+
+        if(ref == NULL) {
+            for(; refs; refs = next) {
+                next = refs->next;
+                free(refs);
+            }
+
+            skiplistDestroy(tail);
+            return NULL;
+        }
+
+        ref->next = refs;
+        refs = ref;
+    }
+
+    /* find the last node before key on every level */
+    for(level = s->height - 1; level >= 0; level--) {
+        while(iter->next[level] && iter->next[level]->key < key) {
+            iter = iter->next[level];
+        }
+
+        update[level] = iter;
+    }
+
+    /* cut every level right after it */
+    for(level = 0; level < s->height; level++) {
+        tail->next[level] = update[level]->next[level];
+        update[level]->next[level] = NULL;
+    }
+
+    tail->height = s->height;
+    skiplistTrimHeight(s);
+    skiplistTrimHeight(tail);
+
+    for(node = tail->next[0]; node; node = node->next[0]) {
+        arena->bytesUsed -= NODE_SIZE(node->height);
+        tailArena->bytesUsed += NODE_SIZE(node->height);
+    }
+
+    /* the nodes of the tail stay where they are */
+    if(arena->pool) {
+        next = refs->next;
+        atomic_fetch_add(&arena->pool->refs, 1);
+        arenaBorrowPool(tailArena, arena->pool, refs);
+        refs = next;
+    }
+
+    for(borrowed = arena->borrowed; borrowed; borrowed = borrowed->next) {
+        next = refs->next;
+        atomic_fetch_add(&borrowed->pool->refs, 1);
+        arenaBorrowPool(tailArena, borrowed->pool, refs);
+        refs = next;
+    }
+
+    return tail;
 }
 
 
@@ -128,18 +726,19 @@ void skiplistPrint(Skiplist s) {
         printf("%d: ", level);
         while(iter -> next[level]) {
             iter = iter -> next[level];
-            printf("%d ", iter -> key);
+            printf("%" PRId64 " ", iter -> key);
         }
         printf("\n");
     }
 }
 
 /* return maximum key less than or equal to key */
-/* or INT_MIN if there is none */
-int
-skiplistSearch(Skiplist s, int key, bool increment)
+/* or SKIPLIST_KEY_MIN if there is none */
+SkiplistKey
+skiplistSearch(Skiplist s, SkiplistKey key, bool increment)
 {
     register int level;
+    Skiplist head = s;
 
     /* start at the top level */
     for(level = s->height - 1; level >= 0; level--) {
@@ -150,7 +749,8 @@ skiplistSearch(Skiplist s, int key, bool increment)
         }
     }
 
-    if(key == s->key && increment) {
+    /* the head only holds a placeholder key, it can't be incremented */
+    if(key == s->key && increment && s != head) {
         s->count++;
     }
 
@@ -158,18 +758,20 @@ skiplistSearch(Skiplist s, int key, bool increment)
 }
 
 /* insert a new key into s */
-void
-skiplistInsert(Skiplist s, int key)
+int
+skiplistInsert(Skiplist s, SkiplistKey key)
 {
     register int level;
     Skiplist elt;
 
     /* creates a new skiplist struct object with a randomized height
      * determined by the function chooseHeight() at function call */
-    elt = skiplistCreateNode(key, chooseHeight());
+    elt = skiplistCreateNode(s, key, chooseHeight(s));
 
     /* ensure that the node was created successfully */
-    assert(elt);
+    if(elt == NULL) {
+        return -1;
+    }
 
     if(elt->height > s->height) {
         s->height = elt->height;
@@ -194,14 +796,16 @@ skiplistInsert(Skiplist s, int key)
         elt->next[level] = s->next[level];
         s->next[level] = elt;
     }
+
+    return 0;
 }
 
 /* delete a key from s */
 void
-skiplistDelete(Skiplist s, int key)
+skiplistDelete(Skiplist s, SkiplistKey key)
 {
     int level;
-    Skiplist target;
+    Skiplist target, head = s;
 
     /* first we have to find leftmost instance of key */
     target = s;
@@ -230,28 +834,39 @@ skiplistDelete(Skiplist s, int key)
         }
     }
 
-    free(target);
+    /* the memory goes back to the arena, to be reused by the next node of the same height */
+    skiplistFreeNode(head, target);
     target = NULL;
 }
 
-int skiplistSafeInsert(Skiplist s, int key) {
+int skiplistSafeInsert(Skiplist s, SkiplistKey key) {
 
 
-    int steps = 0, insertionHeight = chooseHeight(), level;
+    int steps = 0, insertionHeight = chooseHeight(s), level;
+
+    /* keep the head around, s moves along the list while searching */
+    Skiplist head = s;
 
     /* Check to see if the fist value is null, IE empty list */
     if(!s->next[BASE_LEVEL]) {
         /* create the node which we will insert */
-        Skiplist toInsert = skiplistCreateNode(key, insertionHeight);
+        Skiplist toInsert = skiplistCreateNode(head, key, insertionHeight);
+
+        if(toInsert == NULL) {
+            return -1;
+        }
+
         s->height=insertionHeight;
 
         steps += 1;
 
-        for(; insertionHeight >= 0; --insertionHeight) {
-            toInsert->next[insertionHeight] = s->next[insertionHeight];
-            s->next[insertionHeight] = toInsert;
+        for(level = insertionHeight - 1; level >= 0; --level) {
+            toInsert->next[level] = s->next[level];
+            s->next[level] = toInsert;
             steps += 1;
         }
+
+        STAT_INSERT(head, steps, 0, insertionHeight);
         return steps;
     }
 
@@ -272,10 +887,12 @@ int skiplistSafeInsert(Skiplist s, int key) {
              * and slightly reduce the amount of assembly code created */
             s = s->next[level];
             ++steps;
+            STAT_STEP(head, level);
 
             /* we've found the key we're looking for */
             if(s->key == key) {
                 ++s->count; /* increment & return */
+                STAT_INSERT(head, steps, 1, s->height);
                 return steps;
             }
 
@@ -298,9 +915,11 @@ int skiplistSafeInsert(Skiplist s, int key) {
              * and slightly reduce the amount of assembly code created */
             lowerSearch = lowerSearch->next[level];
             ++steps;
+            STAT_STEP(head, level);
 
             if(lowerSearch->key == key) {
                 ++lowerSearch->count;
+                STAT_INSERT(head, steps, 1, lowerSearch->height);
                 return steps;
             }
         }
@@ -310,16 +929,15 @@ int skiplistSafeInsert(Skiplist s, int key) {
      * number we're looking for doesn't exist within the skiplist, and can
      * instead concentrate on trying to insert the new node.
      * */
-    Skiplist toInsert = skiplistCreateNode(key, insertionHeight);
+    Skiplist toInsert = skiplistCreateNode(head, key, insertionHeight);
 
-    while(toInsert == NULL) {
-        toInsert = skiplistCreateNode(key, insertionHeight);
+    /* Check for whether or not the allocation succeeded */
+    if(toInsert == NULL) {
+        return -1;
     }
 
-    assert(toInsert); /* Check for whether or not the allocation succeeded */
-
     /* Since we KNOW we're inserting, we can set the height if it's the highest */
-    s->height = insertionHeight > s->height ? insertionHeight : s->height;
+    head->height = insertionHeight > head->height ? insertionHeight : head->height;
 
     steps += 3;
 
@@ -329,6 +947,7 @@ int skiplistSafeInsert(Skiplist s, int key) {
         while(s->next[level] && s->next[level]->key < key) {
             s = s->next[level];
             ++steps;
+            STAT_STEP(head, level);
         }
 
         /* here we actually perform a linked list insertion at the current level*/
@@ -339,5 +958,6 @@ int skiplistSafeInsert(Skiplist s, int key) {
         steps += 2;
     }
 
+    STAT_INSERT(head, steps, 0, insertionHeight);
     return steps;
 }
\ No newline at end of file
@@ -1,6 +1,21 @@
+#ifndef CFASTSORT_SKIPLIST_H
+#define CFASTSORT_SKIPLIST_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+/* keys are 64-bit, narrower integers and floats are mapped onto them by the sorts */
+typedef int64_t SkiplistKey;
+
+/* key of the head node */
+#define SKIPLIST_KEY_MIN INT64_MIN
+
+/* tallest tower a node can have */
+#define SKIPLIST_MAX_HEIGHT 32
+
 struct skiplist {
-    int key;
-    int count;
+    SkiplistKey key;
+    size_t count;
     int height;                /* number of next pointers */
     struct skiplist *next[1];  /* first of many */
 };
@@ -9,21 +24,67 @@ typedef struct skiplist * Skiplist;
 
 typedef char bool;
 
-/* create an empty skiplist */
+/* create an empty skiplist, or return NULL if out of memory */
+/* every list gets its own seed, nodes go up a level with probability 1/2 */
 Skiplist skiplistCreate(void);
 
-/* destroy a skiplist */
+/* create an empty skiplist, or return NULL if out of memory */
+/* lists created with the same seed and base get the same tower heights. */
+/* nodes go up a level with probability 1/probabilityBase, where the base */
+/* is rounded down to a power of 2 */
+Skiplist skiplistCreateSeeded(uint64_t seed, int probabilityBase);
+
+/* destroy a skiplist, releasing every node at once */
+/* s must be the head returned by skiplistCreate or skiplistCreateSeeded */
 void skiplistDestroy(Skiplist s);
 
+/* number of bytes taken by the live nodes of s, including the head */
+size_t skiplistBytesUsed(Skiplist s);
+
+/* number of bytes allocated by s, including unused room in its slabs. */
+/* memory shared by split lists is counted by the list that allocated it */
+size_t skiplistBytesReserved(Skiplist s);
+
+/** Moves every node of the skiplist into a single slab, laid out in key order,
+ * so that walking the bottom level afterwards touches memory sequentially.
+ *
+ * @param s Skiplist header node to be compacted
+ * @return 0 on success, -1 if out of memory, in which case s is left untouched
+ */
+int skiplistCompact(Skiplist s);
+
+/** Moves every node of other into s in a single pass over both lists, adding up
+ * the counts of keys found in both. The nodes are relinked rather than copied,
+ * so s holds on to the memory of other from then on, and other is freed.
+ * Lists built on different threads can be merged once both threads are done with them.
+ *
+ * @param s Skiplist header node to merge into
+ * @param other Skiplist header node to be merged, must not be s, and can't be used afterwards
+ * @return 0 on success, -1 if out of memory, in which case both lists are left untouched
+ */
+int skiplistMerge(Skiplist s, Skiplist other);
+
+/** Cuts s right before key, moving every node whose key is at least key into a new list.
+ * The nodes are relinked rather than copied, and stay in memory shared with s,
+ * which is kept around until both lists are destroyed. The new list draws its tower
+ * heights from a generator seeded by s, with the same probability base.
+ *
+ * @param s Skiplist header node to be split
+ * @param key Smallest key of the new list
+ * @return The new list, or NULL if out of memory, in which case s is left untouched
+ */
+Skiplist skiplistSplit(Skiplist s, SkiplistKey key);
+
 /* return maximum key less than or equal to key */
-/* or INT_MIN if there is none */
-int skiplistSearch(Skiplist s, int key, bool increment);
+/* or SKIPLIST_KEY_MIN if there is none */
+SkiplistKey skiplistSearch(Skiplist s, SkiplistKey key, bool increment);
 
 /* insert a new key into s */
-void skiplistInsert(Skiplist s, int key);
+/* returns 0 on success, -1 if out of memory */
+int skiplistInsert(Skiplist s, SkiplistKey key);
 
 /* delete a key from s */
-void skiplistDelete(Skiplist s, int key);
+void skiplistDelete(Skiplist s, SkiplistKey key);
 
 /* print out the contents of s in a tower-like form */
 void skiplistPrint(Skiplist s);
@@ -33,6 +94,38 @@ void skiplistPrint(Skiplist s);
  *
  * @param s Skiplist header node to be operated on
  * @param key Value of the key to be inserted or incremented
- * @return The number of steps performed in total
+ * @return The number of steps performed in total, or -1 if out of memory
+ */
+int skiplistSafeInsert(Skiplist s, SkiplistKey key);
+
+#ifdef SKIPLIST_INSTRUMENT
+
+/* number of buckets of the steps histogram, the last one holds every insert taking more steps */
+#define SKIPLIST_STEPS_BUCKETS 128
+
+/** Histograms of what skiplistSafeInsert did, only kept by builds defining SKIPLIST_INSTRUMENT.
+ * Heights are indexed by the height itself, so index 0 of those is always 0.
  */
-int skiplistSafeInsert(Skiplist s, int key);
+struct skiplistStats {
+    unsigned long long inserts;                                   /* keys that created a new node */
+    unsigned long long hits;                                      /* keys that incremented the count of a node */
+    unsigned long long levelSteps[SKIPLIST_MAX_HEIGHT];           /* forward steps taken at each level */
+    unsigned long long steps[SKIPLIST_STEPS_BUCKETS];             /* calls by number of steps they returned */
+    unsigned long long towerHeights[SKIPLIST_MAX_HEIGHT + 1];     /* new nodes by tower height */
+    unsigned long long hitHeights[SKIPLIST_MAX_HEIGHT + 1];       /* hits by tower height of the node hit */
+    unsigned long long listHeights[SKIPLIST_MAX_HEIGHT + 1];      /* calls by height of the list afterwards */
+};
+
+/* copy the stats of s into stats */
+void skiplistGetStats(Skiplist s, struct skiplistStats *stats);
+
+/* stats of every skiplist destroyed so far, which is how the sorts report theirs */
+/* safe to call while other threads destroy skiplists */
+void skiplistGetTotalStats(struct skiplistStats *stats);
+
+/* clear the stats of every skiplist destroyed so far */
+void skiplistResetTotalStats(void);
+
+#endif
+
+#endif //CFASTSORT_SKIPLIST_H
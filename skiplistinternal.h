@@ -0,0 +1,107 @@
+//
+// Parts of skiplist.c shared with the other skiplist engines, which aren't part of the skiplist API
+//
+
+#ifndef CFASTSORT_SKIPLISTINTERNAL_H
+#define CFASTSORT_SKIPLISTINTERNAL_H
+
+#include <stddef.h>
+#include <stdint.h>
+#include <stdatomic.h>
+
+#include "skiplist.h"
+
+/*** NODE ALLOCATION ***/
+/* see skiplist.c for how the arenas, pools and slabs fit together */
+
+/* a large block of memory out of which the nodes are carved */
+struct skiplistSlab {
+    struct skiplistSlab *next; /* previously filled slab */
+    size_t size;               /* number of bytes in data */
+    size_t used;               /* number of bytes of data handed out */
+    char data[];               /* 8-byte aligned, since the members above are */
+};
+
+/* the slabs of a list, shared with every list that took some of its nodes */
+struct skiplistPool {
+    atomic_int refs;              /* number of lists holding on to the pool */
+    struct skiplistSlab *slabs;   /* slab currently being filled, followed by the full ones */
+};
+
+/* a pool of another list, which holds some of the nodes of this one */
+struct skiplistPoolRef {
+    struct skiplistPool *pool;
+    struct skiplistPoolRef *next;
+};
+
+struct skiplistArena {
+    struct skiplistPool *pool;                     /* pool new nodes are carved out of, NULL until the first node */
+    struct skiplistPoolRef *borrowed;              /* pools of other lists that nodes were moved over from */
+    struct skiplist *freed[SKIPLIST_MAX_HEIGHT];   /* deleted nodes to reuse, by height, chained through next[0] */
+    size_t bytesUsed;                              /* bytes taken by the live nodes, including the head */
+    size_t bytesReserved;                          /* bytes allocated by this list for its header and slabs */
+};
+
+/* carve size bytes aligned to align, a power of 2, out of the arena, or return NULL if out of memory */
+void *skiplistArenaCarve(struct skiplistArena *arena, size_t size, size_t align);
+
+/* let go of every pool of the arena, along with the nodes carved out of them */
+void skiplistArenaRelease(struct skiplistArena *arena);
+
+/*** TOWER HEIGHTS ***/
+
+/* state of the random number generator that picks the tower heights */
+struct skiplistRandom {
+    uint64_t state;  /* xorshift64* state, never 0 */
+    int levelBits;   /* log2 of the probability base */
+};
+
+/* seed the generator, nodes go up a level with probability 1/probabilityBase, rounded down to a power of 2 */
+void skiplistRandomSeed(struct skiplistRandom *random, uint64_t seed, int probabilityBase);
+
+/* next 64-bit number of a xorshift64* generator */
+static inline uint64_t
+skiplistRandomNext(struct skiplistRandom *random)
+{
+    uint64_t x = random->state;
+
+    x ^= x >> 12;
+    x ^= x << 25;
+    x ^= x >> 27;
+    random->state = x;
+
+    return x * 0x2545F4914F6CDD1DULL;
+}
+
+/* number of trailing zero bits of x, 64 if x is 0 */
+static inline int
+skiplistCountTrailingZeros(uint64_t x)
+{
+#if defined(__GNUC__) || defined(__clang__)
+    return x ? __builtin_ctzll(x) : 64;
+#else
+    int n = 0;
+
+    if(x == 0) {
+        return 64;
+    }
+
+    while((x & 1) == 0) {
+        x >>= 1;
+        n++;
+    }
+
+    return n;
+#endif
+}
+
+/* choose a height according to a geometric distribution, from the trailing zeros of a single draw */
+static inline int
+skiplistRandomHeight(struct skiplistRandom *random)
+{
+    int height = 1 + skiplistCountTrailingZeros(skiplistRandomNext(random)) / random->levelBits;
+
+    return height < SKIPLIST_MAX_HEIGHT ? height : SKIPLIST_MAX_HEIGHT;
+}
+
+#endif //CFASTSORT_SKIPLISTINTERNAL_H
@@ -1,10 +1,11 @@
-from sorting_algorithms import skipsort, quicksort_recursive, radixsort, \
+from sorting_algorithms import skipsort, skipsort_finger, quicksort_recursive, radixsort, \
     quicksort, python_stl_sort, mergesort, timsort
 from sortingalgos.radixsort import radixsort as radixsort_other
 from sortingalgos.bitonicsort import bitonicsort  # This can only be used if the length is a power of 2
 from sortingalgos.heapsort import heapsort
 from sortingalgos.smoothsort import smoothsort
 from sortingalgos.combsort import combsort
+from src.skiplist import Skiplist, ArraySkiplist
 from sys import maxsize
 from timeit import timeit
 import random
@@ -19,6 +20,12 @@ import colorama.ansi
 from colorama import Fore
 from matplotlib import rc
 
+# The C engine is only available once the extension has been built with `python setup.py build_ext --inplace`
+try:
+    from cfastsort import skipSortOptimized
+except ImportError:
+    skipSortOptimized = None
+
 # This increments the value of the color given as a code
 def increment_color(color_code: str):
     return colorama.ansi.CSI + str((int(color_code.rstrip('m').lstrip(colorama.ansi.CSI).rstrip('m')) + 1) % 108) + 'm'
@@ -74,6 +81,32 @@ def create_random_dataset_standard(a=0, b=maxsize, set_length=100, num_sets=10):
     return sets
 
 
+def create_near_sorted_dataset(a=0, b=maxsize, set_length=100, num_sets=10, disorder=0.05):
+    """ Creates ascending datasets which have a fraction of their elements swapped out of place
+
+    :param int | float a: Lowest possible value for the datasets
+    :param int | float b: Highest possible value for the datasets
+    :param int set_length: Number of elements within each dataset
+    :param int num_sets: Amount of datasets to generate
+    :param float disorder: Fraction of the elements which get swapped with another random element.
+     0 gives fully ascending datasets.
+    :return: A List of the datasets as tuples , though these should be copied to avoid having already sorted data.
+    :rtype: list
+    """
+    sets = []
+
+    for dataset in create_random_dataset_standard(a=a, b=b, set_length=set_length, num_sets=num_sets):
+        dataset = sorted(dataset)
+
+        for swap in range(int(disorder * set_length)):
+            i, j = randint(0, set_length - 1), randint(0, set_length - 1)
+            dataset[i], dataset[j] = dataset[j], dataset[i]
+
+        sets.append(tuple(dataset))
+
+    return sets
+
+
 # This is for testing any other function since skipsort may have a base specified as well
 def sort_test(sort, N=100, a=0, b=maxsize):
     """
@@ -256,9 +289,10 @@ def sort_with_ranged_bases_multithreaded(a=-maxsize-1, b=maxsize, lengths=None,
     return np.array(data)
 
 
-def elements_vs_time(a=-maxsize-1, b=maxsize, trials=100, sorts=(skipsort, quicksort_recursive, python_stl_sort),
+def elements_vs_time(a=-maxsize-1, b=maxsize, trials=100,
+                     sorts=(skipsort, quicksort_recursive, timsort, python_stl_sort),
                      start=10, stop=1000, increment=10, coefficient=5.0, type='linear',
-                     quiet=False, random_func=np.random.normal, **random_params):
+                     quiet=False, random_func=np.random.normal, disorder=None, **random_params):
     """ Measures the time it takes for the given sorting algorithms to sort data as N increases.
     Returns a 2-D numpy array in the form: [[N, time1, ... ]_1, [N, time1, ... ]_2, ..., [N, time1, ...]_n]
 
@@ -275,6 +309,8 @@ def elements_vs_time(a=-maxsize-1, b=maxsize, trials=100, sorts=(skipsort, quick
     :param str type: Method of incrementing, either linear or geometric, however linear works better.
     :param bool quiet: Flag to indicate whether or not to suppress output. Off by default.
     :param function random_func: Random function to use for making datasets, uses the numpy.random.normal by default
+    :param float disorder: If provided, nearly sorted datasets between `a` and `b` are used instead of
+     `random_func`, with this fraction of elements out of place. See `create_near_sorted_dataset`.
     :param dict random_params: Parameters to pass into the random function when generating datasets.
     :return: 2-D Numpy Array in the form [ [N, time1, time2, ...]_1, ... [N, time1, time2, ...]_n ],
      as well as a 1-D Numpy Array containing all the randomly generated numbers
@@ -312,8 +348,12 @@ def elements_vs_time(a=-maxsize-1, b=maxsize, trials=100, sorts=(skipsort, quick
 
         # This is sort of the main dataset that will be used for sorting, the values within
         # Should be copied into a new list each time, prior to sorting
-        unsorted_dataset = create_random_dataset(set_length=n, num_sets=trials,
-                                                 random_func=random_func, **random_params)
+        if disorder is not None:
+            unsorted_dataset = create_near_sorted_dataset(a=a, b=b, set_length=n, num_sets=trials,
+                                                          disorder=disorder)
+        else:
+            unsorted_dataset = create_random_dataset(set_length=n, num_sets=trials,
+                                                     random_func=random_func, **random_params)
 
         # unsorted_dataset = create_random_dataset_standard(a=a, b=b, set_length=n, num_sets=trials)
 
@@ -523,6 +563,109 @@ between {}{}{} and {}{}{} using {}{}{}: {}{:.3f}{} secs\n".format(
         return np.array(data)
 
 
+def memory_per_element(a=0, b=maxsize, start=1000, stop=100000, increment=10000,
+                       storages=(Skiplist, ArraySkiplist), quiet=False):
+    """ Measures how many bytes each distinct key costs in the given Skiplist storage engines as N increases.
+
+    :param int a: Smallest Possible Value
+    :param int b: Largest Possible Value
+    :param int start: First N to Start with
+    :param int stop: Last N to Finish with
+    :param int increment: Increment to Increase by
+    :param list | tuple storages: Skiplist classes to compare, they must provide `insert` and `memory_usage`
+    :param bool quiet: Flag to indicate whether or not to suppress output. Off by default.
+    :return: 2-D Numpy Array in the form [ [N, bytes1, bytes2, ...]_1, ... [N, bytes1, bytes2, ...]_n ],
+     where bytes is the memory used per distinct key
+    :rtype: numpy.ndarray
+    """
+    data = []
+    n = start
+
+    while n <= stop:
+        values = [randint(a, b) for i in range(n)]
+        bytes_per_element = [n] + [0.0] * len(storages)
+
+        for i, storage in enumerate(storages):
+            slist = storage()
+            for value in values:
+                slist.insert(value)
+
+            bytes_per_element[i+1] = slist.memory_usage() / slist.total
+
+            if not quiet:
+                print("N={}{}{} {}{}{}: {}{:.2f}{} bytes/element".format(Fore.CYAN, n, Fore.RESET,
+                                                                      Fore.LIGHTMAGENTA_EX, storage.__name__,
+                                                                      Fore.RESET, Fore.GREEN,
+                                                                      bytes_per_element[i+1], Fore.RESET))
+        data.append(bytes_per_element)
+        n += increment
+
+    return np.array(data)
+
+
+def create_memory_per_element_graph(a=0, b=maxsize, start=1000, stop=100000, increment=10000,
+                                    storages=(Skiplist, ArraySkiplist)):
+
+    data = memory_per_element(a=a, b=b, start=start, stop=stop, increment=increment, storages=storages)
+
+    memory_over_n = pd.DataFrame(data=data[:, 1:], index=data[:, 0],
+                                 columns=list(map(lambda x: x.__name__, storages)))
+
+    plot = memory_over_n.plot(title="Memory Used per Distinct Key by Skiplist Node Storage\n\
+For Values Between {} and {}".format(a, b))
+
+    plot.set_xlabel("Number of Elements (N)")
+    plot.set_ylabel("Bytes per Element")
+
+    # Save the figure as to avoid overwriting other plots
+    plt.savefig("{}/plots/plot{}.png".format(os.getcwd(), len(os.listdir(os.getcwd() + "/plots"))))
+
+    plt.show()
+
+
+def load_c_benchmark(fpath):
+    """ Loads the results written by the C benchmark harness built from main.c
+
+    :param str fpath: Path to the CSV output of the harness, or to its JSON output if it ends with .json
+    :return: DataFrame with one row per engine, distribution, N and thread count, and the columns
+     min_ns_per_element, median_ns_per_element and steps_per_element, which is NaN for engines that don't count steps
+    :rtype: pandas.DataFrame
+    """
+    if fpath.endswith('.json'):
+        return pd.read_json(fpath, orient='records')
+
+    return pd.read_csv(fpath)
+
+
+def create_c_benchmark_graph(fpath, distribution='uniform', metric='median_ns_per_element', threads=None):
+    """ Plots the results of the C benchmark harness for one distribution, with one line per engine
+
+    :param str fpath: Path to the CSV or JSON output of the harness
+    :param str distribution: Distribution to plot, as passed to the harness with -d
+    :param str metric: Column to plot against N, such as min_ns_per_element or steps_per_element
+    :param int threads: Thread count of skipSortParallel to plot, the largest one measured by default
+    """
+    results = load_c_benchmark(fpath)
+    results = results[results['distribution'] == distribution]
+
+    # a scaling run measures skipSortParallel once per thread count
+    threads = threads if threads is not None else results['threads'].max()
+    results = results[(results['threads'] == threads) | (results['engine'] != 'skipSortParallel')]
+
+    metric_over_n = results.pivot(index='n', columns='engine', values=metric)
+
+    plot = metric_over_n.plot(logx=True, title="C Engines Sorting {} Values Between {} and {}".format(
+        distribution.capitalize(), results['low'].min(), results['high'].max()))
+
+    plot.set_xlabel("Number of Elements (N)")
+    plot.set_ylabel(metric.replace('_', ' ').capitalize())
+
+    # Save the figure as to avoid overwriting other plots
+    plt.savefig("{}/plots/plot{}.png".format(os.getcwd(), len(os.listdir(os.getcwd() + "/plots"))))
+
+    plt.show()
+
+
 def create_sorting_data_graph(a=0, b=maxsize, n: list=None, trials=100, start=1.4,
                               stop=2.0, inc=0.05, fpath=None, quiet=False):
 
@@ -620,7 +763,7 @@ def create_sorting_data_graph(a=0, b=maxsize, n: list=None, trials=100, start=1.
 
 
 def create_sparsity_vs_time_graph(minimum=0, start=500, end=1000, increment=5, num_elements=500,
-                                  trials=100, base=2, sorts=(skipsort, quicksort_recursive, python_stl_sort)):
+                                  trials=100, base=2, sorts=(skipsort, quicksort_recursive, timsort, python_stl_sort)):
 
     # Returns a dataset of [[sparsity, time1, ... ]_1, [sparsity, time1, ... ]_2, ..., [sparsity, time1, ... ]_N]
     data = sparsity_vs_time(min_value=minimum, start_value=start, stop_value=end, sorts=sorts,
@@ -643,12 +786,15 @@ As The Value Range Increases From {} to {}".format(num_elements, trials, (start-
 
 
 def create_elements_vs_time_graph(a=0, b=256, start=10, end=5000, increment=5, coefficient=5.0, trials=10,
-                                  sorts=(skipsort, quicksort, python_stl_sort), fpath=None, mode='linear',
-                                  random_func=np.random.normal, overwrite=True, **random_params):
+                                  sorts=(skipsort, quicksort, timsort, python_stl_sort), fpath=None, mode='linear',
+                                  random_func=np.random.normal, overwrite=True, disorder=None, **random_params):
 
+    # Nearly sorted runs are cached apart from the random ones, and from those with another disorder
     fpath = fpath if fpath is not None else\
-        "{}/data/TimeOverElements{}-{}_i{}a{}{}.txt".format(os.getcwd(), end, start, increment,
-                                                            str(coefficient).replace('.', ''), mode)
+        "{}/data/TimeOverElements{}-{}_i{}a{}{}{}.txt".format(os.getcwd(), end, start, increment,
+                                                              str(coefficient).replace('.', ''), mode,
+                                                              '' if disorder is None else
+                                                              '_d' + str(disorder).replace('.', ''))
 
     # We want this to be a json serializable object
     numbers_fpath = fpath + '.json' if fpath.find('.txt') == -1 else \
@@ -664,7 +810,7 @@ def create_elements_vs_time_graph(a=0, b=256, start=10, end=5000, increment=5, c
         data, numbers_frequency = elements_vs_time(a=a, b=b, start=start, stop=end,
                                                    increment=increment, trials=trials,
                                                    sorts=sorts, type=mode, quiet=False, coefficient=coefficient,
-                                                   random_func=random_func, **random_params)
+                                                   random_func=random_func, disorder=disorder, **random_params)
 
         # Try to save the data as a text file
         np.savetxt(fname=fpath, X=data)
@@ -697,8 +843,11 @@ def create_elements_vs_time_graph(a=0, b=256, start=10, end=5000, increment=5, c
     numbers_hist.hist(bins=100)
     # plt.rc('text', usetex=True)
 
-    plt.title(r'Numbers Generated with The {} Function: $\alpha={}$, $\theta={}$'.format(
-        random_func.__name__, random_params['shape'], random_params['scale']))
+    if disorder is not None:
+        plt.title(r'Nearly Sorted Numbers Between {} and {}: {}\% Out of Place'.format(a, b, disorder * 100))
+    else:
+        plt.title(r'Numbers Generated with The {} Function: $\alpha={}$, $\theta={}$'.format(
+            random_func.__name__, random_params['shape'], random_params['scale']))
 
     plt.xlabel("Values Generated")
 
@@ -744,9 +893,19 @@ if __name__ == '__main__':
     random_parameters = {'scale': 2.64, 'shape': 100}
 
     create_elements_vs_time_graph(end=1000000, start=1000, increment=1.14, trials=10, mode='Geometric', overwrite=True,
-                                  sorts=(skipsort, mergesort, combsort,
+                                  sorts=(skipsort, mergesort, timsort, combsort,
                                          radixsort, python_stl_sort, heapsort, smoothsort),
                                   random_func=np.random.gamma, **random_parameters)
 
+    # create_elements_vs_time_graph(a=0, b=256, start=1000, end=100000, increment=1000, trials=10,
+    #                               sorts=(skipsort, skipSortOptimized, python_stl_sort), mode='linear',
+    #                               random_func=np.random.gamma, **random_parameters)
+
+    # create_elements_vs_time_graph(a=0, b=1000000, start=1000, end=100000, increment=1000, trials=10,
+    #                               sorts=(skipsort, skipsort_finger, timsort, python_stl_sort), disorder=0.01)
+
+    # Results of ./skipsort -o data/c_benchmark.csv, see the README
+    # create_c_benchmark_graph(os.getcwd() + '/data/c_benchmark.csv', distribution='uniform')
+
     # create_elements_vs_time_graph(a=0, b=1000000, start=100, end=1000000, bases=(2, 10),
     #                               increment=1, coefficient=10, trials=1, mode='Geometric')
\ No newline at end of file
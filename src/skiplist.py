@@ -1,7 +1,89 @@
-from sys import maxsize
+from sys import getsizeof
+from array import array
+from bisect import bisect_left
+from itertools import repeat
 import random
 from math import ceil
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class HeightGenerator(object):
+    """ Draws tower heights in blocks, with the same distribution as `Skiplist.chooseHeight`.
+
+    `chooseHeight` keeps raising the tower while `rand() <= 1/(b^level)`, so the probability of a height greater
+    than `k` is `b^-(1 + 2 + ... + k)`. These probabilities are precomputed into a threshold table, and a whole
+    height is then read off from a single uniform draw by counting how many thresholds it falls under.
+    Heights are generated a block at a time and handed out from a buffer.
+    """
+
+    def __init__(self, probability_base=2, max_height=32, rng=None, block_size=1024):
+        """ HeightGenerator Constructor
+
+        :param int | float probability_base: Probability base `b`, see `Skiplist`
+        :param int max_height: The Maximum Height to generate
+        :param rng: Source of randomness, used as is so that runs can be reproduced. Can be a `random.Random`,
+         a `numpy.random.Generator` (whole blocks are then drawn at once), or an int seed for a new
+         `random.Random`. If None is provided, the global `random` module is used, without being reseeded.
+        :param int block_size: Number of heights to generate each time the buffer runs out
+        """
+        if rng is None:
+            rng = random
+        elif isinstance(rng, int):
+            rng = random.Random(rng)
+
+        self.rng = rng
+        self.block_size = block_size
+
+        # Vectorised block generation is only possible with numpy's generators
+        self.vectorised = np is not None and isinstance(rng, (np.random.Generator, np.random.RandomState))
+
+        # thresholds[k - 1] is the probability of a height greater than k, stored ascending for bisecting
+        thresholds, probability, level = [], 1.0, 1
+        while level < max_height:
+            probability /= probability_base ** level
+
+            # Any level past this one can't ever be reached
+            if probability == 0.0:
+                break
+
+            thresholds.append(probability)
+            level += 1
+
+        self.thresholds = thresholds[::-1]
+        self.numpy_thresholds = np.array(self.thresholds) if self.vectorised else None
+
+        self.buffer = []
+
+    def take(self, n):
+        """ Generates `n` heights at once
+
+        :param int n: Number of heights to generate
+        :return: List of heights h such that 1 <= h <= max_height
+        :rtype: list
+        """
+        levels = len(self.thresholds) + 1
+
+        if self.vectorised:
+            return (levels - np.searchsorted(self.numpy_thresholds, self.rng.random(n))).tolist()
+
+        thresholds, uniform = self.thresholds, self.rng.random
+        return [levels - bisect_left(thresholds, uniform()) for i in range(n)]
+
+    def next_height(self):
+        """ Hands out the next height from the buffer, refilling it when it's empty
+
+        :return: The height h such that 1 <= h <= max_height
+        :rtype: int
+        """
+        if not self.buffer:
+            self.buffer = self.take(self.block_size)
+
+        return self.buffer.pop()
+
 
 class Skiplist(object):
 
@@ -34,7 +116,8 @@ class Skiplist(object):
     
     '''
 
-    def __init__(self, probability_base=2, max_tower_height=None):
+    def __init__(self, probability_base=2, max_tower_height=None, finger=False, rng=None, indexable=False,
+                 key=None):
         """ Skiplist Constructor
 
         :param int | float probability_base: Number Base to use when calculating
@@ -44,40 +127,233 @@ class Skiplist(object):
         :param int max_tower_height: The max. number of towers this Skiplist can create. If None is provided,
          the default value used will be `int(math.ceil( b^5 ))` where `b` is the probability base specified
          in the first parameter.
+        :param bool finger: If True, `insert` remembers the search path of the last inserted key and starts
+         the next search from there instead of from the head. Ascending and clustered input then costs close
+         to `O(1)` steps per key, while random input stays `O(log n)`.
+        :param rng: Source of randomness for the tower heights, see `HeightGenerator`. Passing a seeded
+         generator makes the structure reproducible.
+        :param bool indexable: If True, every forward link also stores its span, the number of elements (counting
+         duplicates) it jumps over, which enables the `O(log n)` `rank`, `select` and `percentile` queries.
+         Incrementing the count of an existing key then costs a search as well, to update the spans above it.
+        :param function key: If provided, `insert` takes records instead of keys, and orders them by `key(record)`.
+         The key is computed once per record, and the records are kept in the node of their key, in insertion
+         order, so that they can be read back with `values`.
         """
-        random.seed()
-
         self.probability_base = probability_base
         self.max_tower_height = max_tower_height if max_tower_height is not None else int(ceil(probability_base ** 5))
 
-        self.head = self.SNode(-maxsize - 1, self.max_tower_height)
+        self.height_generator = HeightGenerator(probability_base, self.max_tower_height, rng)
+
+        # The key of the head is never compared against, so any orderable key type can be stored
+        self.head = self.SNode(None, self.max_tower_height)
+
+        self.key = key
 
         # This is the actual height value
         self.height = 1
 
         self.total = 0
 
+        # Total number of elements, counting duplicates
+        self.length = 0
+
         self.prehash = dict()
 
+        # node.span[level] is the number of elements after node up to and including node.next[level],
+        # or up to the end of the list when there's no next node
+        self.indexable = indexable
+        if indexable:
+            self.head.span = [0] * self.max_tower_height
+
+        # Predecessor of the last inserted key on every level, and its rank, only kept in finger mode
+        self.finger = [self.head] * self.max_tower_height if finger else None
+        self.finger_rank = [0] * self.max_tower_height if finger else None
+
     def search(self, key):
         """ Search within the Skiplist for the given key, and return the closest value less than or equal
          to the key which was specified to search for.
 
         :param int key: Value to search for within the Skiplist
-        :return: Closest value less than or equal to the `key` parameter
+        :return: Closest value less than or equal to the `key` parameter, or None if there is none
         :rtype: int
         """
         if key in self.prehash:
             return key
 
-        search_node = self.head.next[self.height - 1]
+        return self._last_node_before(key).value
+
+    def _last_node_before(self, key, inclusive=False):
+        """ Finds the last node whose key is less than the given key, in `O(log n)` steps.
+
+        :param key: Key to search for
+        :param bool inclusive: Also step onto a node whose key is equal to `key`
+        :return: The node, which is the head if there is none
+        :rtype: Skiplist.SNode
+        """
+        search_node = self.head
 
         for level in range(self.height - 1, -1, -1):
+            next_node = search_node.next[level]
+
+            while next_node is not None and (next_node.value < key or inclusive and next_node.value == key):
+                search_node = next_node
+                next_node = search_node.next[level]
+
+        return search_node
+
+    def floor(self, key):
+        """ Finds the largest key less than or equal to the given key
+
+        :param key: Key to search for
+        :return: The largest key `<= key`, or None if there is none
+        """
+        if key in self.prehash:
+            return key
+
+        node = self._last_node_before(key)
+        return node.value if node is not self.head else None
+
+    def ceiling(self, key):
+        """ Finds the smallest key greater than or equal to the given key
+
+        :param key: Key to search for
+        :return: The smallest key `>= key`, or None if there is none
+        """
+        if key in self.prehash:
+            return key
+
+        node = self._last_node_before(key).next[0]
+        return node.value if node is not None else None
+
+    def predecessor(self, key):
+        """ Finds the largest key strictly less than the given key
+
+        :param key: Key to search for
+        :return: The largest key `< key`, or None if there is none
+        """
+        node = self._last_node_before(key)
+        return node.value if node is not self.head else None
+
+    def successor(self, key):
+        """ Finds the smallest key strictly greater than the given key
+
+        :param key: Key to search for
+        :return: The smallest key `> key`, or None if there is none
+        """
+        node = self._last_node_before(key, inclusive=True).next[0]
+        return node.value if node is not None else None
+
+    def range(self, lo=None, hi=None, counts=False):
+        """ Iterates over the keys in the half-open interval `[lo, hi)` in ascending order, in `O(log n + k)` steps
+         for `k` keys.
+
+        :param lo: Smallest key to include, or None to start from the smallest key in the Skiplist
+        :param hi: Key to stop before, or None to go up to the largest key in the Skiplist
+        :param bool counts: If True, yield `(key, count)` pairs instead of repeating each key `count` times,
+         or instead of the records if the Skiplist has a key function
+        :return: Generator over the keys in the interval
+        :rtype: generator
+        """
+        node = self.head.next[0] if lo is None else self._last_node_before(lo).next[0]
+
+        while node is not None and (hi is None or node.value < hi):
+            if counts:
+                yield node.value, node.count
+            elif self.key is not None:
+                yield from node.records
+            else:
+                yield from repeat(node.value, node.count)
+
+            node = node.next[0]
+
+    @classmethod
+    def from_iterable(cls, iterable, probability_base=2, max_tower_height=None, balanced=False, rng=None,
+                      finger=False, indexable=False, key=None):
+        """ Builds a Skiplist out of a whole batch of keys at once instead of inserting them one by one.
+
+        Duplicates are collapsed into node counts through `prehash` first, then the distinct keys are ordered
+        and every level is linked in a single left-to-right sweep, so no top-down search is ever performed.
+        The returned Skiplist is a regular one, and can keep being used with `insert`.
+
+        :param iterable: Keys to build the Skiplist from
+        :param int | float probability_base: Probability base of the Skiplist, see the constructor
+        :param int max_tower_height: The max. number of towers the Skiplist can create, see the constructor
+        :param bool balanced: If True, heights are assigned in a deterministic, perfectly balanced pattern
+         where the i-th distinct key (counting from 1) gets one extra level for every time `b` divides `i`.
+         Otherwise heights are drawn randomly, like `insert` would.
+        :param rng: Source of randomness for the tower heights, see `HeightGenerator`
+        :param bool finger: Enable finger search for later insertions, see the constructor
+        :param bool indexable: Keep the link spans for rank queries, see the constructor
+        :param function key: Key function, in which case the iterable holds records, see the constructor
+        :return: The populated Skiplist
+        :rtype: Skiplist
+        """
+        slist = cls(probability_base, max_tower_height, finger=finger, rng=rng, indexable=indexable, key=key)
+        prehash = slist.prehash
+
+        # Collapse the duplicates, the heights are only known once the keys are ordered
+        for record in iterable:
+            record_key = record if key is None else key(record)
+
+            if record_key in prehash:
+                prehash[record_key].count += 1
+            else:
+                prehash[record_key] = cls.SNode(record_key, 1)
+
+                if key is not None:
+                    prehash[record_key].records = []
+
+            if key is not None:
+                prehash[record_key].records.append(record)
+
+        # Integer base used for the balanced pattern
+        base = max(2, int(probability_base))
+
+        # Last node linked on each level, the sweep appends after it, and the number of elements up to it
+        last = [slist.head] * slist.max_tower_height
+        last_rank = [0] * slist.max_tower_height
+        rank = 0
+
+        heights = None if balanced else slist.height_generator.take(len(prehash))
+
+        for position, node_key in enumerate(sorted(prehash), 1):
+            node = prehash[node_key]
+
+            if balanced:
+                height, remaining = 1, position
+                while height < slist.max_tower_height and remaining % base == 0:
+                    remaining //= base
+                    height += 1
+            else:
+                height = heights[position - 1]
 
-            while search_node.next[level] is not None and search_node.next[level].value < key:
-                search_node = search_node.next[level]
+            node.height = height
+            node.next = [None] * height
+            rank += node.count
 
-        return search_node.value
+            if indexable:
+                node.span = [0] * height
+
+            for level in range(height):
+                last[level].next[level] = node
+
+                if indexable:
+                    last[level].span[level] = rank - last_rank[level]
+                    last_rank[level] = rank
+
+                last[level] = node
+
+            slist.height = height if height > slist.height else slist.height
+
+        # The last link on each level spans up to the end of the list
+        if indexable:
+            for level in range(slist.max_tower_height):
+                last[level].span[level] = rank - last_rank[level]
+
+        slist.total = len(prehash)
+        slist.length = rank
+
+        return slist
 
     @staticmethod
     def chooseHeight(probability_base=2, max_height=32):
@@ -110,17 +386,36 @@ class Skiplist(object):
         """ Inserts the given key into the skiplist, if it already isn't in it. If the key already
          exists, increment its value.
 
-        :param int key: Key to insert into the skiplist
+        :param int key: Key to insert into the skiplist, or the record to insert if the Skiplist has a key function
         :returns: Nothing
         :rtype: None
         """
+        record = key
+        if self.key is not None:
+            key = self.key(record)
+
         if key in self.prehash:
 
             # Increment the count and return
             self.prehash[key].count += 1
+            self.length += 1
+
+            if self.key is not None:
+                self.prehash[key].records.append(record)
+
+            # Every link on the path to the key either ends at it or jumps over it
+            if self.indexable:
+                update, ranks = self._find_path(key)
+                for level in range(self.height):
+                    update[level].span[level] += 1
+
             return
 
-        random_height = self.chooseHeight(self.probability_base, self.max_tower_height)
+        random_height = self.height_generator.next_height()
+
+        if self.finger is not None or self.indexable:
+            self._insert_along_path(key, random_height, record)
+            return
 
         current_node = self.head
 
@@ -173,6 +468,9 @@ class Skiplist(object):
         # instantiate the new node to insert
         new_node = self.SNode(key, random_height)
 
+        if self.key is not None:
+            new_node.records = [record]
+
         # Add the node to the hash table for quicker lookup
         self.prehash[new_node.value] = new_node
 
@@ -190,6 +488,355 @@ class Skiplist(object):
 
         # Increment the total amount of elements we have
         self.total += 1
+        self.length += 1
+
+    def _find_path(self, key):
+        """ Finds the last node before `key` on every level, along with its rank if the Skiplist is indexable.
+
+        In finger mode, `self.finger[level]` holds the last node before the previously searched key on each level.
+        If the new key comes after it, we climb the finger only as high as the first level whose node still lies
+        before the new key, since every finger above that one is then still a valid predecessor, and descend from
+        there. A key coming before the previous one can't be reached from the finger, so the search restarts at
+        the head. The finger is updated in place and returned as the path.
+
+        :param key: Key to search the path to
+        :return: The list of predecessors per level, and the list of their ranks, the number of elements up to
+         and including each of them, which is None unless the Skiplist is indexable
+        :rtype: list, list
+        """
+        indexable = self.indexable
+
+        if self.finger is None:
+            update = [self.head] * self.height
+            ranks = [0] * self.height if indexable else None
+            level = self.height - 1
+
+        else:
+            update, ranks = self.finger, self.finger_rank
+
+            if update[0] is not self.head and not update[0].value < key:
+                # We can't move backwards, go back to the head
+                for level in range(self.height):
+                    update[level] = self.head
+                    ranks[level] = 0
+
+                level = self.height - 1
+            else:
+                level = 0
+                while level < self.height - 1 and update[level].next[level] is not None \
+                        and update[level].next[level].value < key:
+                    level += 1
+
+        current_node = update[level]
+        rank = ranks[level] if indexable else 0
+
+        for level in range(level, -1, -1):
+
+            # The old finger on this level may already be further along than the node we've descended to
+            if update[level] is not self.head and (current_node is self.head or
+                                                   current_node.value < update[level].value):
+                current_node = update[level]
+                rank = ranks[level] if indexable else 0
+
+            while current_node.next[level] is not None and current_node.next[level].value < key:
+                if indexable:
+                    rank += current_node.span[level]
+                current_node = current_node.next[level]
+
+            update[level] = current_node
+            if indexable:
+                ranks[level] = rank
+
+        return update, ranks
+
+    def _insert_along_path(self, key, random_height, record):
+        """ Inserts a key which isn't in the Skiplist yet by searching its full path first with `_find_path`,
+         which is needed to keep the finger and the spans up to date.
+
+        :param key: Key to insert into the skiplist
+        :param int random_height: Height of the tower to create for the key
+        :param record: Record to store in the node, if the Skiplist has a key function
+        :returns: Nothing
+        :rtype: None
+        """
+        if random_height > self.height:
+            # The new levels of the head jump over every element
+            if self.indexable:
+                for level in range(self.height, random_height):
+                    self.head.span[level] = self.length
+
+            self.height = random_height
+
+        update, ranks = self._find_path(key)
+
+        new_node = self.SNode(key, random_height)
+        self.prehash[key] = new_node
+
+        if self.key is not None:
+            new_node.records = [record]
+
+        if self.indexable:
+            new_node.span = [0] * random_height
+            rank = ranks[0]
+
+            for level in range(random_height):
+                before = rank - ranks[level]
+
+                # Perform list insertion, splitting the span of the predecessor around the new node
+                new_node.next[level] = update[level].next[level]
+                new_node.span[level] = update[level].span[level] - before
+                update[level].next[level] = new_node
+                update[level].span[level] = before + 1
+
+            # The links above the new tower now jump over one more element
+            for level in range(random_height, self.height):
+                update[level].span[level] += 1
+        else:
+            rank = 0
+
+            for level in range(random_height):
+                new_node.next[level] = update[level].next[level]
+                update[level].next[level] = new_node
+
+        # The new node becomes the finger on each level it reaches
+        if self.finger is not None:
+            for level in range(random_height):
+                self.finger[level] = new_node
+                self.finger_rank[level] = rank + 1
+
+        # Increment the total amount of elements we have
+        self.total += 1
+        self.length += 1
+
+    def decrement(self, key):
+        """ Removes one occurrence of the given key, and unlinks its node once its count reaches 0.
+         If the Skiplist has a key function, the oldest record with that key is removed.
+
+        :param key: Key to decrement
+        :raises KeyError: If the key isn't in the Skiplist
+        :returns: Nothing
+        :rtype: None
+        """
+        if key not in self.prehash:
+            raise KeyError(key)
+
+        node = self.prehash[key]
+
+        if self.key is not None:
+            node.records.pop(0)
+
+        self._discard(node, 1, self._find_path(key)[0])
+
+    def remove(self, key):
+        """ Removes every occurrence of the given key, unlinking its node from every level.
+
+        :param key: Key to remove
+        :raises KeyError: If the key isn't in the Skiplist
+        :return: The number of occurrences removed
+        :rtype: int
+        """
+        if key not in self.prehash:
+            raise KeyError(key)
+
+        node = self.prehash[key]
+        count = node.count
+
+        self._discard(node, count, self._find_path(key)[0])
+
+        return count
+
+    def pop_min(self):
+        """ Removes and returns one occurrence of the smallest key. The head is the predecessor of the smallest
+         node on every level, so no search is needed and this takes `O(1)` expected steps, or `O(log n)`
+         when the spans of an indexable Skiplist have to be updated or the finger has to be reset.
+
+        :raises IndexError: If the Skiplist is empty
+        :return: The smallest key, or the oldest record with the smallest key if the Skiplist has a key function
+        """
+        node = self.head.next[0]
+
+        if node is None:
+            raise IndexError("pop from empty Skiplist")
+
+        self._discard(node, 1, [self.head] * (self.height if self.indexable else node.height))
+
+        return node.value if self.key is None else node.records.pop(0)
+
+    def pop_max(self):
+        """ Removes and returns one occurrence of the largest key, in `O(log n)` steps.
+
+        :raises IndexError: If the Skiplist is empty
+        :return: The largest key, or the newest record with the largest key if the Skiplist has a key function
+        """
+        node = self.head
+
+        for level in range(self.height - 1, -1, -1):
+            while node.next[level] is not None:
+                node = node.next[level]
+
+        if node is self.head:
+            raise IndexError("pop from empty Skiplist")
+
+        self._discard(node, 1, self._find_path(node.value)[0])
+
+        return node.value if self.key is None else node.records.pop()
+
+    def _discard(self, node, amount, update):
+        """ Takes `amount` occurrences away from a node, unlinking it from every level and from `prehash` when
+         none are left, and lowering the height of the Skiplist if its top levels become empty.
+
+        :param Skiplist.SNode node: Node to take the occurrences away from
+        :param int amount: Number of occurrences to remove, at most `node.count`
+        :param list update: The last node before `node` on every level, see `_find_path`
+        :returns: Nothing
+        :rtype: None
+        """
+        node.count -= amount
+        self.length -= amount
+
+        if node.count == 0:
+            # Only the levels the node reaches change, unless the spans above it have to be shortened as well
+            for level in range(self.height if self.indexable else node.height):
+                if level < node.height:
+                    # The predecessor now spans up to wherever the node was pointing
+                    if self.indexable:
+                        update[level].span[level] += node.span[level] - amount
+
+                    update[level].next[level] = node.next[level]
+
+                elif self.indexable:
+                    update[level].span[level] -= amount
+
+            del self.prehash[node.value]
+            self.total -= 1
+
+        elif self.indexable:
+            for level in range(self.height):
+                update[level].span[level] -= amount
+
+        # The finger may point at the removed node, or its ranks may be off now
+        if self.finger is not None:
+            for level in range(self.height):
+                self.finger[level] = self.head
+                self.finger_rank[level] = 0
+
+        while self.height > 1 and self.head.next[self.height - 1] is None:
+            self.height -= 1
+
+    def rank(self, key):
+        """ Counts the elements strictly less than the given key, in `O(log n)` steps.
+
+        :param key: Key to rank
+        :return: Number of elements, counting duplicates, that are less than `key`
+        :rtype: int
+        """
+        if not self.indexable:
+            raise ValueError("rank queries need a Skiplist created with indexable=True")
+
+        current_node, rank = self.head, 0
+
+        for level in range(self.height - 1, -1, -1):
+            while current_node.next[level] is not None and current_node.next[level].value < key:
+                rank += current_node.span[level]
+                current_node = current_node.next[level]
+
+        return rank
+
+    def select(self, k):
+        """ Finds the k-th smallest element, in `O(log n)` steps.
+
+        :param int k: Zero-based position of the element in sorted order, counting duplicates
+        :return: The key at position `k`
+        """
+        if not self.indexable:
+            raise ValueError("select queries need a Skiplist created with indexable=True")
+
+        if not 0 <= k < self.length:
+            raise IndexError("select position {} out of range for {} elements".format(k, self.length))
+
+        current_node, position = self.head, 0
+
+        # Move to the last node whose elements all come at or before position k
+        for level in range(self.height - 1, -1, -1):
+            while current_node.next[level] is not None and position + current_node.span[level] <= k:
+                position += current_node.span[level]
+                current_node = current_node.next[level]
+
+        return current_node.next[0].value
+
+    def percentile(self, q):
+        """ Finds the q-th percentile of the elements using the nearest-rank method, in `O(log n)` steps.
+
+        :param int | float q: Percentile to compute, between 0 and 100
+        :return: The smallest key such that at least q percent of the elements are less than or equal to it
+        """
+        if not 0 <= q <= 100:
+            raise ValueError("percentile must be between 0 and 100, got {}".format(q))
+
+        # Multiply before dividing, since q / 100 isn't exact and would push the rank up by one for some q
+        if isinstance(q, int):
+            rank = -(-q * self.length // 100)
+        else:
+            rank = int(ceil(q * self.length / 100))
+
+        return self.select(max(0, rank - 1))
+
+    def items(self):
+        """ Walks the bottom level of the Skiplist in order
+
+        :return: Generator of `(key, count)` pairs in ascending key order
+        :rtype: generator
+        """
+        node = self.head.next[0]
+
+        while node is not None:
+            yield node.value, node.count
+            node = node.next[0]
+
+    def values(self, reverse=False):
+        """ Walks the bottom level of the Skiplist and yields every element that was inserted, IE each key
+         repeated `count` times, or the records in insertion order if the Skiplist has a key function.
+
+        :param bool reverse: Yield the keys in descending order instead. Records with equal keys
+         still come out in insertion order.
+        :return: Generator over the elements in sorted order
+        :rtype: generator
+        """
+        nodes = []
+        node = self.head.next[0]
+
+        while node is not None:
+            if reverse:
+                nodes.append(node)
+            elif self.key is not None:
+                yield from node.records
+            else:
+                yield from repeat(node.value, node.count)
+
+            node = node.next[0]
+
+        for node in reversed(nodes):
+            if self.key is not None:
+                yield from node.records
+            else:
+                yield from repeat(node.value, node.count)
+
+    def memory_usage(self):
+        """ Approximates the number of bytes held by the nodes of the Skiplist, including the head,
+         the `next` lists and the `prehash` table. The key objects themselves are not counted since
+         they are shared with the data being sorted.
+
+        :return: Number of bytes used
+        :rtype: int
+        """
+        total = getsizeof(self.prehash)
+        node = self.head
+
+        while node is not None:
+            total += getsizeof(node) + getsizeof(node.__dict__) + getsizeof(node.next)
+            node = node.next[0]
+
+        return total
 
     # Method to print the linkedlist
     def print(self):
@@ -206,3 +853,153 @@ class Skiplist(object):
 
         print(s)
 
+
+
+class ArraySkiplist(object):
+    """ Skiplist whose nodes are stored as a struct-of-arrays instead of one `SNode` object per key.
+
+    Every node is an integer index into the flat typed arrays `keys`, `counts`, `heights` and `offsets`.
+    The forward links of all the nodes are packed one after another into the `forward` array, so that
+    the link of node `i` on level `l` lives at `forward[offsets[i] + l]`, and an index of `NIL` marks the
+    end of a level. Index `HEAD` is the head of the list, which owns a full tower of `max_tower_height` links.
+
+    The insertion, search and traversal behave exactly like those of `Skiplist`, except that keys are limited
+    to what the `key_typecode` of the `keys` array can hold.
+    """
+
+    NIL = -1
+    HEAD = 0
+
+    def __init__(self, probability_base=2, max_tower_height=None, key_typecode='q', rng=None):
+        """ ArraySkiplist Constructor
+
+        :param int | float probability_base: Number Base to use when calculating the probability of an inserted
+         data member has of scaling in height, see `Skiplist`.
+        :param int max_tower_height: The max. number of towers this Skiplist can create. If None is provided,
+         the default value used will be `int(math.ceil( b^5 ))`, same as in `Skiplist`.
+        :param str key_typecode: `array` typecode used to store the keys, `'q'` (64-bit signed ints) by default.
+         Use `'d'` to sort floats.
+        :param rng: Source of randomness for the tower heights, see `HeightGenerator`
+        """
+        self.probability_base = probability_base
+        self.max_tower_height = max_tower_height if max_tower_height is not None else int(ceil(probability_base ** 5))
+
+        self.height_generator = HeightGenerator(probability_base, self.max_tower_height, rng)
+
+        # The head is node 0, its key is never compared against
+        self.keys = array(key_typecode, [0])
+        self.counts = array('q', [0])
+        self.heights = array('I', [self.max_tower_height])
+        self.offsets = array('q', [0])
+        self.forward = array('q', [self.NIL]) * self.max_tower_height
+
+        # This is the actual height value
+        self.height = 1
+
+        self.total = 0
+
+        # Maps a key to the index of its node
+        self.prehash = dict()
+
+    def search(self, key):
+        """ Search within the Skiplist for the given key, and return the closest value less than or equal
+         to the key which was specified to search for.
+
+        :param int | float key: Value to search for within the Skiplist
+        :return: Closest value less than or equal to the `key` parameter, or None if there is none
+        :rtype: int | float
+        """
+        if key in self.prehash:
+            return key
+
+        keys, forward, offsets = self.keys, self.forward, self.offsets
+        node = self.HEAD
+
+        for level in range(self.height - 1, -1, -1):
+            next_node = forward[offsets[node] + level]
+
+            while next_node != self.NIL and keys[next_node] <= key:
+                node = next_node
+                next_node = forward[offsets[node] + level]
+
+        return keys[node] if node != self.HEAD else None
+
+    def insert(self, key):
+        """ Inserts the given key into the skiplist, if it already isn't in it. If the key already
+         exists, increment its count.
+
+        :param int | float key: Key to insert into the skiplist
+        :returns: Nothing
+        :rtype: None
+        """
+        node = self.prehash.get(key)
+
+        if node is not None:
+            self.counts[node] += 1
+            return
+
+        random_height = self.height_generator.next_height()
+
+        keys, forward, offsets = self.keys, self.forward, self.offsets
+
+        # The new node goes at the end of the arrays, its links at the end of `forward`
+        new_node = len(keys)
+        new_offset = len(forward)
+
+        keys.append(key)
+        self.counts.append(1)
+        self.heights.append(random_height)
+        offsets.append(new_offset)
+        forward.extend(array('q', [self.NIL]) * random_height)
+
+        self.prehash[key] = new_node
+
+        self.height = random_height if random_height > self.height else self.height
+
+        current_node = self.HEAD
+
+        for level in range(self.height - 1, -1, -1):
+
+            # Move to the node immediately before the insertion point on this level
+            next_node = forward[offsets[current_node] + level]
+            while next_node != self.NIL and keys[next_node] < key:
+                current_node = next_node
+                next_node = forward[offsets[current_node] + level]
+
+            # Perform list insertion on the levels the new tower reaches
+            if level < random_height:
+                forward[new_offset + level] = next_node
+                forward[offsets[current_node] + level] = new_node
+
+        # Increment the total amount of elements we have
+        self.total += 1
+
+    def items(self):
+        """ Walks the bottom level of the Skiplist in order
+
+        :return: Generator of `(key, count)` pairs in ascending key order
+        :rtype: generator
+        """
+        keys, counts, forward, offsets = self.keys, self.counts, self.forward, self.offsets
+        node = forward[offsets[self.HEAD]]
+
+        while node != self.NIL:
+            yield keys[node], counts[node]
+            node = forward[offsets[node]]
+
+    def memory_usage(self):
+        """ Approximates the number of bytes held by the node arrays and the `prehash` table, counted the
+         same way as `Skiplist.memory_usage`.
+
+        :return: Number of bytes used
+        :rtype: int
+        """
+        return sum(getsizeof(arr) for arr in (self.keys, self.counts, self.heights, self.offsets, self.forward)) + \
+            getsizeof(self.prehash) + sum(getsizeof(node) for node in self.prehash.values())
+
+    def print(self):
+        """ Basic method to print the linkedlist
+
+        :return:
+        """
+        print("".join(str(key) + ", " for key, count in self.items()))
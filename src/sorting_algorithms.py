@@ -1,18 +1,143 @@
 from sys import maxsize
-from src.skiplist import Skiplist
+from src.skiplist import Skiplist, ArraySkiplist
 from random import randint
+from itertools import repeat
+from bisect import bisect_left, bisect_right
+import numpy as np
 
 
 # skipsort algorithm implementation in python
-def skipsort(data: list, probability_base=2):
-    slist = Skiplist(probability_base)
-    while len(data) != 0:
-        slist.insert(data.pop(0))
+def skipsort(data: list, probability_base=2, storage='node', finger=False, rng=None, engine='auto',
+             dense_sparsity=1.0, key=None, reverse=False):
+    """ Sorts the data in place by inserting it into a Skiplist and reading it back from the bottom level
+
+        When the data is dense, IE its sparsity `S = |B - A|/N` is low (see `sparsity_vs_time`), the Skiplist is
+    pure overhead, since nearly every value in the range is present. In that case the integers are counted
+    directly into an array indexed by `value - A` instead, which takes `O(N + |B - A|)` steps.
+
+    :param list data: List of numbers to sort
+    :param int | float probability_base: Probability base of the Skiplist
+    :param str storage: Node storage to use, either 'node' for `Skiplist` or 'array' for `ArraySkiplist`.
+     The 'array' storage keeps its keys in a typed array, so it only sorts data made of nothing but floats,
+     or of nothing but ints that fit in 64 bits.
+    :param bool finger: Use finger search for the insertions, which pays off on nearly sorted or clustered data.
+     Only used by the 'node' storage.
+    :param rng: Source of randomness for the tower heights, see `HeightGenerator`
+    :param str engine: Either 'skiplist', 'counting', or 'auto' to pick the counting engine when the sparsity
+     found by a min/max pass over the data is at most `dense_sparsity`, and every element is exactly an `int`.
+    :param float dense_sparsity: Highest sparsity at which 'auto' picks the counting engine
+    :param function key: Function computing the key to sort each element by, called once per element.
+     Elements with equal keys keep their original order. Only the skiplist engine with 'node' storage
+     supports it.
+    :param bool reverse: Sort in descending order, elements with equal keys still keep their original order
+    :return: Name of the engine which sorted the data, 'counting' or 'skiplist'
+    :rtype: str
+    """
+    if engine not in ('auto', 'skiplist', 'counting'):
+        raise ValueError("engine must be either 'auto', 'skiplist' or 'counting', not {!r}".format(engine))
+
+    if storage not in ('node', 'array'):
+        raise ValueError("storage must be either 'node' or 'array', not {!r}".format(storage))
+
+    if key is not None and engine == 'counting':
+        raise ValueError("the counting engine can't sort with a key function")
+
+    if engine != 'skiplist' and key is None and len(data) != 0:
+        # Anything but ints, bools included, would come back from the counts as ints
+        integers = set(map(type, data)) == {int}
+
+        if engine == 'counting' and not integers:
+            raise TypeError("the counting engine can only sort ints")
+
+        if integers:
+            low, high = min(data), max(data)
+
+            if engine == 'counting' or (high - low) / len(data) <= dense_sparsity:
+                data[:] = direct_address_sort(data, low, high, reverse)
+                return 'counting'
+
+    # Floats only fit in a double array, anything else is left to the int array to accept or reject
+    key_typecode = 'd' if storage == 'array' and data and all(isinstance(value, float) for value in data) else 'q'
+
+    data[:] = skipsort_iter(data, probability_base, storage, finger, rng, key, reverse, key_typecode)
+    return 'skiplist'
+
+
+def direct_address_sort(data, low, high, reverse=False):
+    """ Counts every integer into a flat array indexed by `value - low`, in `O(N + |high - low|)` steps.
+
+    :param data: Iterable of integers between `low` and `high`
+    :param int low: Smallest value in the data
+    :param int high: Largest value in the data
+    :param bool reverse: Yield the values in descending order instead
+    :return: Generator yielding every value in ascending order, each one as many times as it was seen
+    :rtype: generator
+    """
+    counts = [0] * (high - low + 1)
+
+    for value in data:
+        counts[value - low] += 1
+
+    if reverse:
+        return _expand_counts(zip(range(high, low - 1, -1), reversed(counts)))
+
+    return _expand_counts(zip(range(low, high + 1), counts))
+
+
+def skipsort_iter(iterable, probability_base=2, storage='node', finger=False, rng=None, key=None, reverse=False,
+                  key_typecode='q'):
+    """ Streaming version of skipsort. The whole iterable is consumed into a Skiplist when this is called,
+     without being copied, and the sorted values are then produced lazily from the bottom level.
+
+    :param iterable: Any iterable or generator of numbers
+    :param int | float probability_base: Probability base of the Skiplist
+    :param str storage: Node storage to use, either 'node' for `Skiplist` or 'array' for `ArraySkiplist`
+    :param bool finger: Use finger search for the insertions, only used by the 'node' storage
+    :param rng: Source of randomness for the tower heights, see `HeightGenerator`
+    :param function key: Function computing the key to sort each element by, called once per element.
+     Only supported by the 'node' storage.
+    :param bool reverse: Yield the values in descending order, elements with equal keys keep their original order
+    :param str key_typecode: `array` typecode of the keys of the 'array' storage, `'q'` for 64-bit ints or `'d'`
+     for floats, see `ArraySkiplist`
+    :return: Generator yielding every value in ascending order, each one as many times as it was seen
+    :rtype: generator
+    """
+    if storage not in ('node', 'array'):
+        raise ValueError("storage must be either 'node' or 'array', not {!r}".format(storage))
+
+    if storage == 'array':
+        if key is not None:
+            raise ValueError("the 'array' storage can't sort with a key function")
+
+        slist = ArraySkiplist(probability_base, key_typecode=key_typecode, rng=rng)
+    else:
+        slist = Skiplist(probability_base, finger=finger, rng=rng, key=key)
+
+    insert = slist.insert
+    for value in iterable:
+        try:
+            insert(value)
+        except (TypeError, OverflowError) as error:
+            if storage != 'array':
+                raise
+
+            raise ValueError("the 'array' storage keeps its keys in an array of typecode {!r}, which can't hold {!r}"
+                             .format(key_typecode, value)) from error
+
+    if storage == 'array':
+        return _expand_counts(reversed(list(slist.items())) if reverse else slist.items())
+
+    return slist.values(reverse)
+
+
+def _expand_counts(items):
+    for key, count in items:
+        yield from repeat(key, count)
+
 
-    head = slist.head.next[0]
-    while head is not None:
-        data += [head.value] * head.count
-        head = head.next[0]
+# skipsort using finger search, so that it can be benchmarked by name
+def skipsort_finger(data: list, probability_base=2):
+    skipsort(data, probability_base, finger=True)
 
 
 # For testing the algorithm
@@ -25,68 +150,135 @@ def bubblesort(data):
                 data[i + 1] = temp
 
 
-def partition(arr, l, h):
-    i = (l - 1)
-    x = arr[h]
+# Ranges this short are finished by insertion sort rather than partitioned
+QUICKSORT_CUTOFF = 16
+
+# Ranges at least this long take the ninther, the median of three medians of three, as their pivot
+QUICKSORT_NINTHER = 128
+
+
+def _median_of_three(arr, i, j, k):
+    """ Index of the median of arr[i], arr[j] and arr[k] """
+    if arr[j] < arr[i]:
+        i, j = j, i
+
+    # arr[i] <= arr[j]
+    if arr[k] < arr[j]:
+        return i if arr[k] < arr[i] else k
+
+    return j
+
+
+def _quicksort_pivot(arr, l, h):
+    """ Index of the pivot of arr[l:h + 1], which is close to the median even when the range is presorted """
+    m = (l + h) // 2
+
+    if h - l + 1 < QUICKSORT_NINTHER:
+        return _median_of_three(arr, l, m, h)
+
+    s = (h - l) // 8
+    return _median_of_three(arr, _median_of_three(arr, l, l + s, l + 2 * s),
+                            _median_of_three(arr, m - s, m, m + s),
+                            _median_of_three(arr, h - 2 * s, h - s, h))
+
+
+def partition(arr, l, h, pivot):
+    """ Dutch flag partition of arr[l:h + 1] around pivot, so that every key equal to it is done in one pass
+
+    :return: (lt, gt) such that arr[l:lt] < pivot, arr[lt:gt + 1] == pivot and arr[gt + 1:h + 1] > pivot
+    """
+    lt, i, gt = l, l, h
+
+    while i <= gt:
+        x = arr[i]
+
+        if x < pivot:
+            arr[i], arr[lt] = arr[lt], x
+            lt += 1
+            i += 1
+        elif pivot < x:
+            arr[i], arr[gt] = arr[gt], x
+            gt -= 1
+        else:
+            i += 1
+
+    return lt, gt
+
+
+def _sift_down(arr, base, root, n):
+    """ Moves arr[base + root] down the max-heap arr[base:base + n] until it's larger than its children """
+    value = arr[base + root]
+    child = 2 * root + 1
+
+    while child < n:
+        if child + 1 < n and arr[base + child] < arr[base + child + 1]:
+            child += 1
+
+        if not value < arr[base + child]:
+            break
+
+        arr[base + root] = arr[base + child]
+        root, child = child, 2 * child + 1
+
+    arr[base + root] = value
 
-    for j in range(l, h):
-        if arr[j] <= x:
-            # increment index of smaller element
-            i = i + 1
-            arr[i], arr[j] = arr[j], arr[i]
 
-    arr[i + 1], arr[h] = arr[h], arr[i + 1]
-    return (i + 1)
+def _heapsort(arr, l, h):
+    """ Heapsort of arr[l:h + 1], which quicksort falls back on when its partitions keep coming out lopsided """
+    n = h - l + 1
+
+    for root in range(n // 2 - 1, -1, -1):
+        _sift_down(arr, l, root, n)
+
+    for end in range(n - 1, 0, -1):
+        arr[l], arr[l + end] = arr[l + end], arr[l]
+        _sift_down(arr, l, 0, end)
 
 
-# Function to do Quick sort
-# arr[] --> Array to be sorted,
-# l  --> Starting index,
-# h  --> Ending index
 def quicksort(arr, l=0, h=None):
-    # Create an auxiliary stack
+    """ Introsort of arr[l:h + 1] in place
+
+    Each range is split around a median of three, or a ninther for long ranges, into the keys smaller than,
+    equal to and larger than the pivot, so duplicate-heavy data finishes in few passes. The larger side is pushed
+    onto a stack while the smaller one is split right away, which keeps the stack O(log n) deep. Short ranges are
+    finished by insertion sort, and a range that is still being split after 2 log2(n) levels is heapsorted instead,
+    so the worst case is O(n log n).
+
+    :param list arr: List to sort
+    :param int l: Index of the first element to sort
+    :param int h: Index of the last element to sort, the end of the list by default
+    """
     h = len(arr) - 1 if h is None else h
 
-    size = h - l + 1
-    stack = [0] * (size)
-
-    # initialize top of stack
-    top = -1
-
-    # push initial values of l and h to stack
-    top = top + 1
-    stack[top] = l
-    top = top + 1
-    stack[top] = h
-
-    # Keep popping from stack while is not empty
-    while top >= 0:
-
-        # Pop h and l
-        h = stack[top]
-        top = top - 1
-        l = stack[top]
-        top = top - 1
-
-        # Set pivot element at its correct position in
-        # sorted array
-        p = partition(arr, l, h)
-
-        # If there are elements on left side of pivot,
-        # then push left side to stack
-        if p - 1 > l:
-            top = top + 1
-            stack[top] = l
-            top = top + 1
-            stack[top] = p - 1
-
-        # If there are elements on right side of pivot,
-        # then push right side to stack
-        if p + 1 < h:
-            top = top + 1
-            stack[top] = p + 1
-            top = top + 1
-            stack[top] = h
+    if h <= l:
+        return
+
+    depth = 2 * (h - l + 1).bit_length()
+    stack = []
+
+    while True:
+        while h - l + 1 > QUICKSORT_CUTOFF:
+            if depth == 0:
+                _heapsort(arr, l, h)
+                break
+
+            depth -= 1
+            lt, gt = partition(arr, l, h, arr[_quicksort_pivot(arr, l, h)])
+
+            if lt - l < h - gt:
+                stack.append((gt + 1, h, depth))
+                h = lt - 1
+            else:
+                stack.append((l, lt - 1, depth))
+                l = gt + 1
+        else:
+            insertion_sort(arr, l, h + 1)
+
+        if not stack:
+            return
+
+        l, h, depth = stack.pop()
+
 
 # Recursive impleentation
 def quicksort_recursive(x):
@@ -106,116 +298,144 @@ def quicksort_recursive(x):
         return first_part + second_part
 
 
-def merge(a, left, mid, right):
-    """
-    Merge fuction
+def merge(source, dest, lo, mid, hi):
+    """ Merges the sorted runs source[lo:mid] and source[mid:hi] into dest[lo:hi], which is stable
+
+    :param list source: List holding both runs
+    :param list dest: List the merged run is written to, which mustn't be source
+    :param int lo: Start of the first run
+    :param int mid: End of the first run and start of the second one
+    :param int hi: End of the second run
     """
-    # Copy array
-    copy_list = []
-    i, j = left, mid + 1
-    ind = left
+    # the runs are already in order, so the merge is a copy
+    if not source[mid] < source[mid - 1]:
+        dest[lo:hi] = source[lo:hi]
+        return
 
-    while ind < right + 1:
+    i, j, k = lo, mid, lo
 
-        # if left array finish merging, copy from right side
-        if i > mid:
-            copy_list.append(a[j])
-            j += 1
-        # if right array finish merging, copy from left side
-        elif j > right:
-            copy_list.append(a[i])
-            i += 1
-        # Check if right array value is less than left one
-        elif a[j] < a[i]:
-            copy_list.append(a[j])
+    while i < mid and j < hi:
+        # ties are taken from the first run, which keeps the sort stable
+        if source[j] < source[i]:
+            dest[k] = source[j]
             j += 1
         else:
-            copy_list.append(a[i])
+            dest[k] = source[i]
             i += 1
-        ind += 1
+        k += 1
+
+    # whatever is left of either run is larger than everything merged so far
+    if i < mid:
+        dest[k:hi] = source[i:mid]
+    else:
+        dest[k:hi] = source[j:hi]
 
-    ind = 0
-    for x in (range(left, right + 1)):
-        a[x] = copy_list[ind]
-        ind += 1
 
-# This is an iterative implementation of timsort_merge sort
 def mergesort(list_, left=0, right=None):
-    """
-    Iterative version of the Merge Sort Algorithm
+    """ Natural bottom-up mergesort of list_[left:right + 1] in place, which is stable
+
+    The list is first split into its ascending runs and its strictly descending ones, which get reversed,
+    so presorted or reversed input takes a single O(n) pass. Each pass then merges pairs of neighbouring runs
+    from one list into the other, alternating between list_ and a single auxiliary list rather than copying back.
+
+    :param list list_: List to sort
+    :param int left: Index of the first element to sort
+    :param int right: Index of the last element to sort, the end of the list by default
     """
     right = len(list_) - 1 if right is None else right
-    factor = 2
-    temp_mid = 0
-    # Main loop to iterate over the array by 2^n.
-    while 1:
-        index = 0
-        left = 0
-        right = len(list_) - (len(list_) % factor) - 1
-        mid = int(factor / 2) - 1
-
-        # Auxiliary array to timsort_merge subdivisions
-        while index < right:
-            temp_left = index
-            temp_right = temp_left + factor - 1
-            mid2 = int((temp_right + temp_left) / 2)
-            merge(list_, temp_left, mid2, temp_right)
-            index = (index + factor)
-
-        # Chek if there is something to timsort_merge from the remaining
-        # Sub-array created by the factor
-        if len(list_) % factor and temp_mid != 0:
-            # timsort_merge sub array to later be merged to the final array
-            merge(list_, right + 1, temp_mid, len(list_) - 1)
-            # Update the pivot
-            mid = right
-        # Increase the factor
-        factor = factor * 2
-        temp_mid = right
-
-        # Final timsort_merge, timsort_merge subarrays created by the subdivision
-        # of the factor to the main array.
-        if factor > len(list_):
-            mid = right
-            right = len(list_) - 1
-            merge(list_, 0, mid, right)
-            break
-
 
-def radixsort(alist, base=10):
-    if alist == []:
+    if left != 0 or right != len(list_) - 1:
+        part = list_[left:right + 1]
+        mergesort(part)
+        list_[left:right + 1] = part
         return
 
-    def key_factory(digit, base):
-        def key(alist, index):
-            return ((alist[index] // (base ** digit)) % base)
+    n = len(list_)
 
-        return key
+    # boundaries of the runs, runs[k] is where run k starts and runs[-1] is n
+    runs = [0]
+    while runs[-1] < n:
+        runs.append(runs[-1] + _timsort_count_run(list_, runs[-1], n))
 
-    largest = max(alist)
-    exp = 0
-    while base ** exp <= largest:
-        alist = counting_sort(alist, base - 1, key_factory(exp, base))
-        exp = exp + 1
-    return alist
+    source, dest = list_, None
+
+    while len(runs) > 2:
+        if dest is None:
+            dest = [None] * n
+
+        merged = [0]
+
+        for k in range(0, len(runs) - 1, 2):
+            lo = runs[k]
+
+            if k + 2 < len(runs):
+                merge(source, dest, lo, runs[k + 1], runs[k + 2])
+                merged.append(runs[k + 2])
+            else:
+                # a run without a partner is copied over as it is
+                dest[lo:n] = source[lo:n]
+                merged.append(n)
+
+        source, dest = dest, source
+        runs = merged
+
+    if source is not list_:
+        list_[:] = source
+
+
+# Digit widths radixsort supports, 8 and 16 bits are a byte and a short, 11 bits make 6 passes over a 64-bit key
+RADIX_DIGIT_BITS = (8, 11, 16)
+
+
+def radixsort(alist, bits=8):
+    """ LSD radix sort of integers, vectorised with numpy
+
+    Every pass is a stable counting sort of one digit of the keys, which runs in C: numpy's stable argsort of
+    an array of 8 or 16 bit digits is a counting sort. Signed keys have their sign bit flipped, which orders
+    two's complement numbers like unsigned ones, and the passes over digits that are the same for every key
+    are skipped, so that a narrow range of values takes few passes no matter how large the values are.
+
+    :param alist: List or 1-d numpy array of integers that fit in 64 bits, sorted in place
+    :param int bits: Width of the digit sorted by each pass, one of RADIX_DIGIT_BITS
+    :return: alist, sorted
+    """
+    if bits not in RADIX_DIGIT_BITS:
+        raise ValueError("radixsort digits are {} bits wide, not {}".format(RADIX_DIGIT_BITS, bits))
+
+    if len(alist) < 2:
+        return alist
+
+    keys = np.asarray(alist)
 
+    if keys.ndim != 1 or not np.issubdtype(keys.dtype, np.integer):
+        raise TypeError("radixsort sorts a flat sequence of 64-bit integers, not a {}-d array of {}".format(
+            keys.ndim, keys.dtype))
 
-def counting_sort(alist, largest, key):
-    c = [0] * (largest + 1)
-    for i in range(len(alist)):
-        c[key(alist, i)] = c[key(alist, i)] + 1
+    width = keys.dtype.itemsize * 8
+    unsigned = np.dtype('u{}'.format(keys.dtype.itemsize))
+    sign = unsigned.type(1 << (width - 1) if np.issubdtype(keys.dtype, np.signedinteger) else 0)
+    mask = unsigned.type((1 << min(bits, width)) - 1)
 
-    # Find the last index for each element
-    c[0] = c[0] - 1  # to decrement each element for zero-based indexing
-    for i in range(1, largest + 1):
-        c[i] = c[i] + c[i - 1]
+    ukeys = keys.view(unsigned) ^ sign
 
-    result = [None] * len(alist)
-    for i in range(len(alist) - 1, -1, -1):
-        result[c[key(alist, i)]] = alist[i]
-        c[key(alist, i)] = c[key(alist, i)] - 1
+    # bits that differ between any two keys, the digits without any of them are the same for every key
+    varying = int(np.bitwise_or.reduce(ukeys ^ ukeys[0]))
 
-    return result
+    for shift in range(0, width, bits):
+        if (varying >> shift) & int(mask) == 0:
+            continue
+
+        digits = ((ukeys >> unsigned.type(shift)) & mask).astype(np.uint8 if bits == 8 else np.uint16)
+        ukeys = ukeys[np.argsort(digits, kind='stable')]
+
+    result = (ukeys ^ sign).view(keys.dtype)
+
+    if isinstance(alist, np.ndarray):
+        alist[...] = result
+    else:
+        alist[:] = result.tolist()
+
+    return alist
 
 
 def test(sort, N=100, a=0, b=maxsize):
@@ -228,100 +448,571 @@ def python_stl_sort(data: list):
     data.sort()
 
 
-# based off of this code https://gist.github.com/nandajavarma/a3a6b62f34e74ec4c31674934327bbd3
-# Brandon Skerritt
-# https://skerritt.tech
+def insertion_sort(the_array, lo=0, hi=None, start=None):
+    """ Binary insertion sort of the_array[lo:hi] in place, which is stable
+
+    Every element is placed after a binary search for its position among the already sorted ones,
+    and the larger ones are shifted up by a single slice assignment rather than one at a time.
+
+    :param list the_array: List to sort
+    :param int lo: Index of the first element to sort
+    :param int hi: Index past the last element to sort, the end of the list by default
+    :param int start: the_array[lo:start] is already sorted, lo + 1 by default
+    """
+    hi = len(the_array) if hi is None else hi
+    start = lo + 1 if start is None or start <= lo else start
+
+    for index in range(start, hi):
+        value = the_array[index]
+
+        # bisect_right keeps equal elements in their original order
+        pos = bisect_right(the_array, value, lo, index)
+
+        if pos != index:
+            the_array[pos + 1:index + 1] = the_array[pos:index]
+            the_array[pos] = value
+
+
+# Once one run wins this many times in a row during a merge, the merge starts galloping
+TIMSORT_MIN_GALLOP = 7
+
+
+def _timsort_minrun(n):
+    """ Length of the shortest run timsort builds, between 32 and 64 unless n is smaller,
+    chosen so that n / minrun is a power of 2 or slightly less than one. """
+    r = 0
+    while n >= 64:
+        r |= n & 1
+        n >>= 1
+    return n + r
+
+
+def _timsort_count_run(a, lo, hi):
+    """ Length of the run starting at a[lo], which is reversed in place if it's strictly descending.
+    Descending runs have to be strict so that reversing them keeps the sort stable. """
+    run_hi = lo + 1
+
+    if run_hi == hi:
+        return 1
+
+    if a[run_hi] < a[lo]:
+        while run_hi < hi and a[run_hi] < a[run_hi - 1]:
+            run_hi += 1
+
+        i, j = lo, run_hi - 1
+        while i < j:
+            a[i], a[j] = a[j], a[i]
+            i += 1
+            j -= 1
+    else:
+        while run_hi < hi and not a[run_hi] < a[run_hi - 1]:
+            run_hi += 1
+
+    return run_hi - lo
+
+
+def _gallop_left(key, a, base, n, hint):
+    """ Finds the position k in a[base:base + n] where key goes before any equal elements,
+    so that a[base + k - 1] < key <= a[base + k]. The search starts at a[base + hint] and moves away from
+    it by 1, 3, 7, ... elements before a binary search, which is fast when k is close to the hint. """
+    last_ofs, ofs = 0, 1
+
+    if a[base + hint] < key:
+        max_ofs = n - hint
+        while ofs < max_ofs and a[base + hint + ofs] < key:
+            last_ofs, ofs = ofs, (ofs << 1) + 1
+        ofs = min(ofs, max_ofs)
+        last_ofs, ofs = last_ofs + hint, ofs + hint
+    else:
+        max_ofs = hint + 1
+        while ofs < max_ofs and not a[base + hint - ofs] < key:
+            last_ofs, ofs = ofs, (ofs << 1) + 1
+        ofs = min(ofs, max_ofs)
+        last_ofs, ofs = hint - ofs, hint - last_ofs
+
+    # a[base + last_ofs] < key <= a[base + ofs]
+    return bisect_left(a, key, base + last_ofs + 1, base + ofs) - base
+
+
+def _gallop_right(key, a, base, n, hint):
+    """ Same as _gallop_left, except that key goes after any equal elements,
+    so that a[base + k - 1] <= key < a[base + k]. """
+    last_ofs, ofs = 0, 1
+
+    if key < a[base + hint]:
+        max_ofs = hint + 1
+        while ofs < max_ofs and key < a[base + hint - ofs]:
+            last_ofs, ofs = ofs, (ofs << 1) + 1
+        ofs = min(ofs, max_ofs)
+        last_ofs, ofs = hint - ofs, hint - last_ofs
+    else:
+        max_ofs = n - hint
+        while ofs < max_ofs and not key < a[base + hint + ofs]:
+            last_ofs, ofs = ofs, (ofs << 1) + 1
+        ofs = min(ofs, max_ofs)
+        last_ofs, ofs = last_ofs + hint, ofs + hint
+
+    # a[base + last_ofs] <= key < a[base + ofs]
+    return bisect_right(a, key, base + last_ofs + 1, base + ofs) - base
+
+
+class _TimsortState(object):
+    """ Run stack of a timsort, along with the single temporary buffer its merges copy the smaller run into """
+
+    def __init__(self, a):
+        self.a = a
+        self.tmp = []
+        self.runs = []  # (start, length) of the pending runs, from left to right
+        self.min_gallop = TIMSORT_MIN_GALLOP
+
+    def merge_collapse(self):
+        """ Merges pending runs until every run is longer than the two after it put together,
+        and longer than the next one. That keeps the stack O(log n) deep and the merges balanced. """
+        runs = self.runs
+
+        while len(runs) > 1:
+            n = len(runs) - 2
+
+            if (n > 0 and runs[n - 1][1] <= runs[n][1] + runs[n + 1][1]) or \
+                    (n > 1 and runs[n - 2][1] <= runs[n - 1][1] + runs[n][1]):
+                if runs[n - 1][1] < runs[n + 1][1]:
+                    n -= 1
+            elif runs[n][1] > runs[n + 1][1]:
+                break
+
+            self.merge_at(n)
+
+    def merge_force_collapse(self):
+        """ Merges every pending run, once the whole array has been split into runs """
+        runs = self.runs
+
+        while len(runs) > 1:
+            n = len(runs) - 2
+
+            if n > 0 and runs[n - 1][1] < runs[n + 1][1]:
+                n -= 1
+
+            self.merge_at(n)
+
+    def merge_at(self, i):
+        """ Merges the runs at i and i + 1 on the stack """
+        a = self.a
+        base1, n1 = self.runs[i]
+        base2, n2 = self.runs[i + 1]
+
+        self.runs[i] = (base1, n1 + n2)
+        del self.runs[i + 1]
+
+        # elements of the first run that are smaller than the whole second run are already in place
+        k = _gallop_right(a[base2], a, base1, n1, 0)
+        base1, n1 = base1 + k, n1 - k
+
+        if n1 == 0:
+            return
+
+        # and so are the elements of the second run that are larger than the whole first run
+        n2 = _gallop_left(a[base1 + n1 - 1], a, base2, n2, n2 - 1)
 
-def binary_search(the_array, item, start, end):
-    if start == end:
-        if the_array[start] > item:
-            return start
+        if n2 == 0:
+            return
+
+        if n1 <= n2:
+            self.merge_lo(base1, n1, base2, n2)
         else:
-            return start + 1
-    if start > end:
-        return start
+            self.merge_hi(base1, n1, base2, n2)
+
+    def merge_lo(self, base1, n1, base2, n2):
+        """ Merges the adjacent runs a[base1:base1 + n1] and a[base2:base2 + n2], where n1 <= n2, from left to right.
+        The first run is copied into the temporary buffer, and a[base2] must be smaller than a[base1]. """
+        a, tmp = self.a, self.tmp
+        tmp[:n1] = a[base1:base1 + n1]
+
+        cursor1, cursor2, dest = 0, base2, base1
+        min_gallop = self.min_gallop
+
+        a[dest] = a[cursor2]
+        dest, cursor2, n2 = dest + 1, cursor2 + 1, n2 - 1
+
+        while n1 > 1 and n2 > 0:
+            count1 = count2 = 0
+
+            # one element at a time, until one run keeps winning
+            while n1 > 1 and n2 > 0 and (count1 | count2) < min_gallop:
+                if a[cursor2] < tmp[cursor1]:
+                    a[dest] = a[cursor2]
+                    dest, cursor2, n2 = dest + 1, cursor2 + 1, n2 - 1
+                    count1, count2 = 0, count2 + 1
+                else:
+                    a[dest] = tmp[cursor1]
+                    dest, cursor1, n1 = dest + 1, cursor1 + 1, n1 - 1
+                    count1, count2 = count1 + 1, 0
+
+            if n1 <= 1 or n2 == 0:
+                break
+
+            # galloping, which copies whole stretches of a run at once, for as long as it pays off
+            min_gallop += 1
+
+            while True:
+                min_gallop -= min_gallop > 1
+
+                count1 = _gallop_right(a[cursor2], tmp, cursor1, n1, 0)
+                if count1:
+                    a[dest:dest + count1] = tmp[cursor1:cursor1 + count1]
+                    dest, cursor1, n1 = dest + count1, cursor1 + count1, n1 - count1
+                    if n1 <= 1:
+                        break
+
+                a[dest] = a[cursor2]
+                dest, cursor2, n2 = dest + 1, cursor2 + 1, n2 - 1
+                if n2 == 0:
+                    break
+
+                count2 = _gallop_left(tmp[cursor1], a, cursor2, n2, 0)
+                if count2:
+                    a[dest:dest + count2] = a[cursor2:cursor2 + count2]
+                    dest, cursor2, n2 = dest + count2, cursor2 + count2, n2 - count2
+                    if n2 == 0:
+                        break
+
+                a[dest] = tmp[cursor1]
+                dest, cursor1, n1 = dest + 1, cursor1 + 1, n1 - 1
+                if n1 == 1:
+                    break
+
+                if count1 < TIMSORT_MIN_GALLOP and count2 < TIMSORT_MIN_GALLOP:
+                    # galloping stopped paying off, so make it harder to get back into
+                    min_gallop += 1
+                    break
+
+        self.min_gallop = max(min_gallop, 1)
+
+        if n1 == 1 and n2 > 0:
+            # the last element of the first run is larger than everything left in the second one
+            a[dest:dest + n2] = a[cursor2:cursor2 + n2]
+            a[dest + n2] = tmp[cursor1]
+        elif n1:
+            a[dest:dest + n1] = tmp[cursor1:cursor1 + n1]
+
+    def merge_hi(self, base1, n1, base2, n2):
+        """ Same as merge_lo, for n1 > n2. The second run is copied into the temporary buffer,
+        and the runs are merged from right to left. a[base1 + n1 - 1] must be larger than a[base2 + n2 - 1]. """
+        a, tmp = self.a, self.tmp
+        tmp[:n2] = a[base2:base2 + n2]
+
+        # the cursors point at the last element left in each run, what's left of tmp is always tmp[:n2]
+        cursor1, cursor2, dest = base1 + n1 - 1, n2 - 1, base2 + n2 - 1
+        min_gallop = self.min_gallop
+
+        a[dest] = a[cursor1]
+        dest, cursor1, n1 = dest - 1, cursor1 - 1, n1 - 1
+
+        while n2 > 1 and n1 > 0:
+            count1 = count2 = 0
+
+            while n2 > 1 and n1 > 0 and (count1 | count2) < min_gallop:
+                if tmp[cursor2] < a[cursor1]:
+                    a[dest] = a[cursor1]
+                    dest, cursor1, n1 = dest - 1, cursor1 - 1, n1 - 1
+                    count1, count2 = count1 + 1, 0
+                else:
+                    a[dest] = tmp[cursor2]
+                    dest, cursor2, n2 = dest - 1, cursor2 - 1, n2 - 1
+                    count1, count2 = 0, count2 + 1
+
+            if n2 <= 1 or n1 == 0:
+                break
+
+            min_gallop += 1
+
+            while True:
+                min_gallop -= min_gallop > 1
+
+                count1 = n1 - _gallop_right(tmp[cursor2], a, base1, n1, n1 - 1)
+                if count1:
+                    dest, cursor1, n1 = dest - count1, cursor1 - count1, n1 - count1
+                    a[dest + 1:dest + 1 + count1] = a[cursor1 + 1:cursor1 + 1 + count1]
+                    if n1 == 0:
+                        break
+
+                a[dest] = tmp[cursor2]
+                dest, cursor2, n2 = dest - 1, cursor2 - 1, n2 - 1
+                if n2 <= 1:
+                    break
+
+                count2 = n2 - _gallop_left(a[cursor1], tmp, 0, n2, n2 - 1)
+                if count2:
+                    dest, cursor2, n2 = dest - count2, cursor2 - count2, n2 - count2
+                    a[dest + 1:dest + 1 + count2] = tmp[cursor2 + 1:cursor2 + 1 + count2]
+                    if n2 <= 1:
+                        break
+
+                a[dest] = a[cursor1]
+                dest, cursor1, n1 = dest - 1, cursor1 - 1, n1 - 1
+                if n1 == 0:
+                    break
+
+                if count1 < TIMSORT_MIN_GALLOP and count2 < TIMSORT_MIN_GALLOP:
+                    min_gallop += 1
+                    break
+
+        self.min_gallop = max(min_gallop, 1)
+
+        if n2 == 1 and n1 > 0:
+            # the first element of the second run is smaller than everything left in the first one
+            dest, cursor1 = dest - n1, cursor1 - n1
+            a[dest + 1:dest + 1 + n1] = a[cursor1 + 1:cursor1 + 1 + n1]
+            a[dest] = tmp[cursor2]
+        elif n2:
+            a[dest - n2 + 1:dest + 1] = tmp[:n2]
+
+
+def timsort(the_array):
+    """ Sorts the_array in place with timsort, which is stable.
+
+    The array is split into natural runs, ascending ones or strictly descending ones which get reversed, and runs
+    shorter than minrun are extended with binary insertion sort. The runs are pushed onto a stack that merges them
+    as soon as they'd get unbalanced, and a merge copies the smaller run into a single temporary buffer, switching
+    to galloping when one run keeps winning, so that partially ordered data takes far fewer than n log n comparisons.
+
+    :param list the_array: List to sort
+    """
+    n = len(the_array)
+
+    if n < 2:
+        return
+
+    state = _TimsortState(the_array)
+    minrun = _timsort_minrun(n)
+    lo = 0
+
+    while lo < n:
+        run = _timsort_count_run(the_array, lo, n)
+
+        if run < minrun:
+            forced = min(minrun, n - lo)
+            insertion_sort(the_array, lo, lo + forced, lo + run)
+            run = forced
 
-    mid = round((start + end) / 2)
+        state.runs.append((lo, run))
+        state.merge_collapse()
+        lo += run
 
-    if the_array[mid] < item:
-        return binary_search(the_array, item, mid + 1, end)
+    state.merge_force_collapse()
 
-    elif the_array[mid] > item:
-        return binary_search(the_array, item, start, mid - 1)
 
+# Thresholds sort(algorithm='auto') picks an engine by, which calibrate_sort_thresholds fits to benchmark results
+SORT_THRESHOLDS = {
+    'small': 32,                # inputs this short are insertion sorted
+    'presorted_runs': 0.05,     # at most this many runs per element means nearly sorted input, which timsort takes
+    'skipsort_sparsity': 1.0,   # integers at most this sparse are skipsorted, see `sparsity_vs_time`
+    'duplicates': 0.1,          # at most this many distinct values per element means duplicate-heavy input
+    'radix_min_size': 2048,     # integers from a wide range are radix sorted from this many elements on
+}
+
+# Number of elements profile_data samples, in SORT_SAMPLE_BLOCKS contiguous blocks spread over the input
+SORT_SAMPLE_SIZE = 1024
+SORT_SAMPLE_BLOCKS = 16
+
+
+def profile_data(data, sample_size=SORT_SAMPLE_SIZE):
+    """ Measures what sort(algorithm='auto') needs to know about the data to pick an engine
+
+    The types, minimum and maximum come from a pass over the whole data, which runs in C. The number of
+    distinct values and the number of runs are estimated from a sample made of contiguous blocks spread over the
+    data, so that the blocks keep whatever order the data is in.
+
+    :param list data: List to profile
+    :param int sample_size: Number of elements to sample, the whole data is used if it isn't longer. It must be at
+     least 2 * SORT_SAMPLE_BLOCKS, so that every block has a pair of neighbours to compare.
+    :return: Dictionary of the size 'n', the 'min' and 'max', whether the data is made of 'integers', the estimated
+     number of 'distinct' values, which is n if the values can't be hashed, the estimated number of ascending or
+     descending 'runs', and the 'sparsity' `|B - A|/N`, which is None if the values can't be subtracted
+    :rtype: dict
+    """
+    if sample_size < 2 * SORT_SAMPLE_BLOCKS:
+        raise ValueError("sample_size must be at least {}, got {}".format(2 * SORT_SAMPLE_BLOCKS, sample_size))
+
+    n = len(data)
+    profile = {'n': n, 'min': None, 'max': None, 'integers': False, 'distinct': n, 'runs': min(n, 1),
+               'sparsity': None}
+
+    if n == 0:
+        return profile
+
+    profile['min'], profile['max'] = min(data), max(data)
+    profile['integers'] = set(map(type, data)) == {int}
+
+    try:
+        profile['sparsity'] = abs(profile['max'] - profile['min']) / n
+    except TypeError:
+        pass
+
+    if n <= sample_size:
+        blocks = [data]
     else:
-        return mid
+        length = sample_size // SORT_SAMPLE_BLOCKS
+        step = (n - length) // (SORT_SAMPLE_BLOCKS - 1)
+        blocks = [data[start:start + length] for start in range(0, step * SORT_SAMPLE_BLOCKS, step)]
+
+    sampled, pairs, breaks, counts = 0, 0, 0, {}
+
+    for block in blocks:
+        ascents = descents = 0
+
+        for previous, value in zip(block, block[1:]):
+            if previous < value:
+                ascents += 1
+            elif value < previous:
+                descents += 1
+
+        # the block breaks at least this many times into ascending or descending runs
+        breaks += min(ascents, descents)
+        pairs += len(block) - 1
+        sampled += len(block)
+
+        # values that can be ordered but not hashed leave the number of distinct ones unknown
+        if counts is not None:
+            try:
+                for value in block:
+                    counts[value] = counts.get(value, 0) + 1
+            except TypeError:
+                counts = None
+
+    # the gaps between the blocks weren't looked at, so the breaks are scaled by neighbouring pairs, not elements
+    profile['runs'] = 1 + (breaks if sampled == n else round(breaks * (n - 1) / pairs))
+
+    if counts is not None and sampled == n:
+        profile['distinct'] = len(counts)
+    elif counts is not None:
+        # values seen once in the sample stand for sqrt(n / sampled) values each, as in the GEE estimator
+        singletons = sum(1 for count in counts.values() if count == 1)
+        distinct = (n / sampled) ** 0.5 * singletons + len(counts) - singletons
+        profile['distinct'] = int(min(n, max(len(counts), distinct)))
+
+    return profile
+
+
+def choose_sort(profile, thresholds=None):
+    """ Picks the engine that sort(algorithm='auto') uses for data with the given profile
+
+    :param dict profile: Profile of the data, see `profile_data`
+    :param dict thresholds: Thresholds to decide by, SORT_THRESHOLDS by default. Missing ones are taken from it.
+    :return: Name of the sorting function to use
+    :rtype: str
+    """
+    thresholds = dict(SORT_THRESHOLDS, **(thresholds or {}))
+    n = profile['n']
 
+    if n <= thresholds['small']:
+        return 'insertion_sort'
 
-"""
-Insertion sort that timsort uses if the array size is small or if
-the size of the "run" is small
-"""
+    if profile['runs'] <= thresholds['presorted_runs'] * n:
+        return 'timsort'
 
+    duplicates = profile['distinct'] <= thresholds['duplicates'] * n
 
-def insertion_sort(the_array):
-    l = len(the_array)
-    for index in range(1, l):
-        value = the_array[index]
-        pos = binary_search(the_array, value, 0, index - 1)
-        the_array = the_array[:pos] + [value] + the_array[pos:index] + the_array[index + 1:]
-    return the_array
+    if profile['integers']:
+        if profile['sparsity'] <= thresholds['skipsort_sparsity'] or duplicates:
+            return 'skipsort'
+
+        if n >= thresholds['radix_min_size'] and -2 ** 63 <= profile['min'] and profile['max'] < 2 ** 63:
+            return 'radixsort'
+
+    if duplicates:
+        return 'quicksort'
 
+    return 'python_stl_sort'
 
-def timsort_merge(left, right):
-    """Takes two sorted lists and returns a single sorted list by comparing the
-    elements one at a time.
-    [1, 2, 3, 4, 5, 6]
+
+def sort(data, algorithm='auto', thresholds=None):
+    """ Sorts the data in place with the given engine, or with the one that suits it best
+
+    :param list data: List to sort
+    :param str algorithm: Name of the sorting function to use, or 'auto' to pick it with `choose_sort` from a
+     profile of the data, see `profile_data`
+    :param dict thresholds: Thresholds 'auto' decides by, SORT_THRESHOLDS by default, see `calibrate_sort_thresholds`
+    :return: Name of the engine which sorted the data
+    :rtype: str
     """
-    if not left:
-        return right
-    if not right:
-        return left
-    if left[0] < right[0]:
-        return [left[0]] + timsort_merge(left[1:], right)
-    return [right[0]] + timsort_merge(left, right[1:])
+    engines = {'insertion_sort': insertion_sort, 'timsort': timsort, 'mergesort': mergesort, 'quicksort': quicksort,
+               'radixsort': radixsort, 'python_stl_sort': python_stl_sort}
 
+    if algorithm == 'auto':
+        algorithm = choose_sort(profile_data(data), thresholds)
 
-def timsort(the_array):
-    runs, sorted_runs = [], []
-    length = len(the_array)
-    new_run = [the_array[0]]
-
-    # for every i in the range of 1 to length of array
-    for i in range(1, length):
-        # if i is at the end of the list
-        if i == length - 1:
-            new_run.append(the_array[i])
-            runs.append(new_run)
-            break
-        # if the i'th element of the array is less than the one before it
-        if the_array[i] < the_array[i - 1]:
-            # if new_run is set to None (NULL)
-            if not new_run:
-                runs.append([the_array[i]])
-                new_run.append(the_array[i])
-            else:
-                runs.append(new_run)
-                new_run = []
-        # else if its equal to or more than
-        else:
-            new_run.append(the_array[i])
+    if algorithm == 'skipsort':
+        # the counting engine of skipsort takes over up to the same sparsity
+        skipsort(data, dense_sparsity=dict(SORT_THRESHOLDS, **(thresholds or {}))['skipsort_sparsity'])
+    elif algorithm in engines:
+        engines[algorithm](data)
+    else:
+        raise ValueError("unknown sorting algorithm {}, expected 'auto', 'skipsort' or one of {}".format(
+            algorithm, ', '.join(sorted(engines))))
+
+    return algorithm
 
-    # for every item in runs, append it using insertion sort
-    for item in runs:
-        sorted_runs.append(insertion_sort(item))
 
-    # for every run in sorted_runs, timsort_merge them
-    sorted_array = []
-    for run in sorted_runs:
-        sorted_array = timsort_merge(sorted_array, run)
+def calibrate_sort_thresholds(results, sorts, measure='sparsity', thresholds=None):
+    """ Fits the thresholds of sort(algorithm='auto') to the timings of a `graphing_sorts` sweep
+
+    With `measure='sparsity'`, the results of `sparsity_vs_time` set 'skipsort_sparsity' to the highest sparsity
+    up to which skipsort is the fastest. With `measure='n'`, the results of `elements_vs_time` set 'small' to the
+    largest N up to which insertion_sort is the fastest, and 'radix_min_size' to the smallest N from which
+    radixsort is the fastest. The sweeps have to include those sorts for their thresholds to be fitted.
+
+    :param results: 2-D array of the form [[x, time1, time2, ...]_1, ...], or the path of one saved by numpy.savetxt
+    :param list | tuple sorts: Sorting functions timed by the sweep, or their names, in the order of the time columns
+    :param str measure: Either 'sparsity' or 'n', what the first column of the results is
+    :param dict thresholds: Thresholds to start from, SORT_THRESHOLDS by default
+    :return: The fitted thresholds, which can be passed to `sort`
+    :rtype: dict
+    """
+    if measure not in ('sparsity', 'n'):
+        raise ValueError("measure must be either 'sparsity' or 'n', not {}".format(measure))
+
+    results = np.loadtxt(results) if isinstance(results, str) else np.asarray(results)
+    results = results[np.argsort(results[:, 0])]
+
+    names = [getattr(sort_function, '__name__', sort_function) for sort_function in sorts]
+    winners = [names[column] for column in np.argmin(results[:, 1:], axis=1)]
+    xs = results[:, 0].tolist()
+
+    def fastest_up_to(name):
+        """ Largest x up to which name wins every row, None if it loses the first one """
+        last = None
+        for x, winner in zip(xs, winners):
+            if winner != name:
+                break
+            last = x
+        return last
+
+    thresholds = dict(SORT_THRESHOLDS, **(thresholds or {}))
+
+    if measure == 'sparsity' and 'skipsort' in names:
+        thresholds['skipsort_sparsity'] = fastest_up_to('skipsort') or 0.0
+
+    if measure == 'n' and 'insertion_sort' in names:
+        thresholds['small'] = int(fastest_up_to('insertion_sort') or 0)
+
+    if measure == 'n' and 'radixsort' in names:
+        # the smallest N from which radixsort wins every row, or never if it loses the last one
+        first = float('inf')
+        for x, winner in zip(reversed(xs), reversed(winners)):
+            if winner != 'radixsort':
+                break
+            first = x
+        thresholds['radix_min_size'] = int(first) if first != float('inf') else first
+
+    return thresholds
 
 
 if __name__ == '__main__':
     # slist = Skiplist()
     from graphing_sorts import create_random_dataset_standard
-    dataset = create_random_dataset_standard(b=10, set_length=10, num_sets=1)[0]
+    dataset = list(create_random_dataset_standard(b=10, set_length=10, num_sets=1)[0])
     print(dataset)
     timsort(dataset)
+    print(dataset)
 
     # slist.print()
\ No newline at end of file
@@ -0,0 +1,23 @@
+from math import ceil
+
+from src.skiplist import Skiplist
+
+
+def test_percentile_matches_nearest_rank():
+    skiplist = Skiplist.from_iterable(range(1, 101), indexable=True)
+    reference = list(range(1, 101))
+
+    for q in range(101):
+        assert skiplist.percentile(q) == reference[max(0, -(-q * 100 // 100) - 1)]
+        assert skiplist.percentile(float(q)) == reference[max(0, int(ceil(q * 100 / 100)) - 1)]
+
+    assert [skiplist.percentile(q) for q in (7, 14, 28)] == [7, 14, 28]
+
+
+def test_percentile_with_duplicates():
+    data = [(i * 37) % 23 for i in range(250)]
+    skiplist = Skiplist.from_iterable(data, indexable=True)
+    reference = sorted(data)
+
+    for q in range(101):
+        assert skiplist.percentile(q) == reference[max(0, -(-q * len(data) // 100) - 1)]
@@ -0,0 +1,55 @@
+import pytest
+
+from src.sorting_algorithms import sort, profile_data, skipsort, skipsort_iter
+
+
+def test_sort_unhashable_short():
+    data = [[2], [1], [3]]
+
+    assert sort(data) == 'insertion_sort'
+    assert data == [[1], [2], [3]]
+
+
+def test_sort_unhashable_falls_back_to_a_comparison_sort():
+    data = [[(i * 7919) % 1000] for i in range(5000)]
+    expected = sorted(data)
+
+    assert profile_data(data)['distinct'] == len(data)
+    assert sort(data) == 'python_stl_sort'
+    assert data == expected
+
+
+def test_profile_data_rejects_samples_too_small_for_the_blocks():
+    for sample_size in (0, 8, 16, 31):
+        with pytest.raises(ValueError):
+            profile_data(list(range(1000)), sample_size=sample_size)
+
+
+def test_profile_data_smallest_sample_sees_sorted_data_as_one_run():
+    assert profile_data(list(range(1000)), sample_size=32)['runs'] == 1
+    assert profile_data(list(range(1000, 0, -1)), sample_size=32)['runs'] == 1
+
+
+def test_skipsort_array_storage_sorts_floats():
+    data = [((i * 7919) % 1000) / 7 - 50 for i in range(2000)]
+    expected = sorted(data)
+
+    assert skipsort(data, storage='array') == 'skiplist'
+    assert data == expected
+
+
+def test_skipsort_array_storage_rejects_what_its_keys_cant_hold():
+    for data in ([1, 2.5, 3], [2 ** 63, 1]):
+        with pytest.raises(ValueError):
+            skipsort(data, storage='array', engine='skiplist')
+
+
+def test_skipsort_rejects_unknown_engine_and_storage():
+    with pytest.raises(ValueError):
+        skipsort([3, 1, 2], engine='countng')
+
+    with pytest.raises(ValueError):
+        skipsort([3, 1, 2], storage='arrays')
+
+    with pytest.raises(ValueError):
+        skipsort_iter([3, 1, 2], storage='nodes')
@@ -0,0 +1,342 @@
+//
+// Unrolled skiplist, whose nodes hold a small sorted block of keys
+//
+
+#include <stdlib.h>
+#include <stddef.h>
+#include <string.h>
+#include <inttypes.h>
+#include <stdio.h>
+#include <time.h>
+
+#include "unrolledskiplist.h"
+
+#define MAX_HEIGHT SKIPLIST_MAX_HEIGHT
+#define B UNROLLED_BLOCK_KEYS
+
+/* number of bytes taken by a block with the given height */
+#define BLOCK_SIZE(height) (sizeof(struct unrolledBlock) + sizeof(struct unrolledBlock *) * ((height) - 1))
+
+/*
+ * The classic skiplist spends most of its time chasing next pointers, each of
+ * which lands in a different cache line. Here the bottom level is a linked list
+ * of blocks holding up to B sorted keys, and a tower stands on every block
+ * rather than on every key, so there are about B times fewer pointers to chase
+ * and the last few comparisons are a linear scan through a single cache line.
+ *
+ * The blocks are carved out of the same kind of slab arena as the nodes of the
+ * classic skiplist, one cache line aligned, and their heights come from the same
+ * generator, see skiplistinternal.h.
+ * */
+
+/* fill update with the last block at each level whose first key is less than key,
+ * or less than or equal to it if inclusive is set, and return the one at the bottom.
+ * That is the head if there is no such block */
+static struct unrolledBlock *
+findPath(UnrolledSkiplist s, SkiplistKey key, bool inclusive, struct unrolledBlock **update, int *steps)
+{
+    struct unrolledBlock *b = s->head;
+    int level;
+
+    for(level = b->height - 1; level >= 0; level--) {
+        while(b->next[level] && (b->next[level]->keys[0] < key ||
+                                 (inclusive && b->next[level]->keys[0] == key))) {
+            b = b->next[level];
+            ++*steps;
+        }
+
+        update[level] = b;
+    }
+
+    return b;
+}
+
+/* create an empty block and link it in after update[level] at each of its levels */
+static struct unrolledBlock *
+insertBlock(UnrolledSkiplist s, struct unrolledBlock **update)
+{
+    int level, height = skiplistRandomHeight(&s->random);
+    struct unrolledBlock *b = s->freed[height - 1];
+
+    if(b) {
+        /* reuse a removed block of the same height */
+        s->freed[height - 1] = b->next[0];
+    } else {
+        b = skiplistArenaCarve(&s->arena, BLOCK_SIZE(height), UNROLLED_BLOCK_ALIGN);
+
+        if(b == NULL) {
+            return NULL;
+        }
+    }
+
+    s->arena.bytesUsed += BLOCK_SIZE(height);
+
+    b->used = 0;
+    b->height = height;
+
+    /* levels the list didn't have so far start at the head */
+    for(level = s->head->height; level < height; level++) {
+        update[level] = s->head;
+    }
+
+    if(height > s->head->height) {
+        s->head->height = height;
+    }
+
+    for(level = 0; level < height; level++) {
+        b->next[level] = update[level]->next[level];
+        update[level]->next[level] = b;
+    }
+
+    s->blocks++;
+
+    return b;
+}
+
+/* unlink b from the list and keep it for reuse, update must hold its predecessors */
+static void
+removeBlock(UnrolledSkiplist s, struct unrolledBlock *b, struct unrolledBlock **update)
+{
+    int level;
+
+    for(level = 0; level < b->height; level++) {
+        update[level]->next[level] = b->next[level];
+    }
+
+    while(s->head->height > 1 && s->head->next[s->head->height - 1] == NULL) {
+        s->head->height--;
+    }
+
+    s->blocks--;
+    s->arena.bytesUsed -= BLOCK_SIZE(b->height);
+
+    b->next[0] = s->freed[b->height - 1];
+    s->freed[b->height - 1] = b;
+}
+
+/* create an empty unrolled skiplist, seeded from the clock and from where it lives in memory */
+UnrolledSkiplist
+unrolledSkiplistCreate(void)
+{
+    UnrolledSkiplist s = malloc(sizeof(struct unrolledSkiplist));
+    struct timespec now;
+    int level;
+
+    if(s == NULL) {
+        return NULL;
+    }
+
+    s->head = malloc(BLOCK_SIZE(MAX_HEIGHT));
+
+    if(s->head == NULL) {
+        free(s);
+        return NULL;
+    }
+
+    timespec_get(&now, TIME_UTC);
+
+    skiplistRandomSeed(&s->random, ((uint64_t)now.tv_sec * 1000000000ULL + (uint64_t)now.tv_nsec) ^ (uintptr_t)s, 2);
+
+    memset(&s->arena, 0, sizeof(s->arena));
+    memset(s->freed, 0, sizeof(s->freed));
+    s->blocks = 0;
+
+    /* like in skiplist.c, the height of the head is the height of the list */
+    s->head->used = 0;
+    s->head->height = 1;
+
+    for(level = 0; level < MAX_HEIGHT; level++) {
+        s->head->next[level] = NULL;
+    }
+
+    return s;
+}
+
+/* destroy an unrolled skiplist, all the blocks go away with the slabs of the arena */
+void
+unrolledSkiplistDestroy(UnrolledSkiplist s)
+{
+    if(s) {
+        skiplistArenaRelease(&s->arena);
+        free(s->head);
+        free(s);
+    }
+}
+
+int
+unrolledSkiplistSafeInsert(UnrolledSkiplist s, SkiplistKey key)
+{
+    struct unrolledBlock *update[MAX_HEIGHT], *b, *next, *split;
+    int steps = 0, level, i, half;
+
+    b = findPath(s, key, 1, update, &steps);
+
+    if(b == s->head) {
+        /* key is smaller than every key in the list, so it goes at the front of the first block */
+        b = s->head->next[0];
+        i = 0;
+
+        if(b == NULL) {
+            b = insertBlock(s, update);
+
+            if(b == NULL) {
+                return -1;
+            }
+        }
+
+        /* a split of b has to link the new block in after b */
+        for(level = 0; level < b->height; level++) {
+            update[level] = b;
+        }
+    } else {
+        /* the rest of the search is a linear scan inside a single block */
+        for(i = 0; i < b->used && b->keys[i] < key; i++) {
+            ++steps;
+        }
+
+        ++steps;
+
+        /* we've found the key we're looking for */
+        if(i < b->used && b->keys[i] == key) {
+            if(b->counts[i] == UNROLLED_MAX_COUNT) {
+                return -1;
+            }
+
+            ++b->counts[i];
+            return steps;
+        }
+    }
+
+    if(b->used == B) {
+        next = b->next[0];
+
+        if(next && next->used < B) {
+            if(i < B) {
+                /* hand the largest key over to the next block, it's still smaller than any of the next keys */
+                memmove(next->keys + 1, next->keys, sizeof(SkiplistKey) * next->used);
+                memmove(next->counts + 1, next->counts, sizeof(uint32_t) * next->used);
+                next->keys[0] = b->keys[B - 1];
+                next->counts[0] = b->counts[B - 1];
+                next->used++;
+                b->used--;
+            } else {
+                /* key is larger than any key of b, and smaller than any key of next */
+                b = next;
+                i = 0;
+            }
+
+            steps += 1;
+        } else {
+            split = insertBlock(s, update);
+
+            if(split == NULL) {
+                return -1;
+            }
+
+            /* keys appended past the end of a block start a new one, so that sorted
+             * input leaves full blocks behind, and anything else splits the block in half */
+            half = i == B ? B : B / 2;
+
+            memcpy(split->keys, b->keys + half, sizeof(SkiplistKey) * (B - half));
+            memcpy(split->counts, b->counts + half, sizeof(uint32_t) * (B - half));
+            split->used = B - half;
+            b->used = half;
+
+            if(i >= half) {
+                b = split;
+                i -= half;
+            }
+
+            steps += 1 + split->height;
+        }
+    }
+
+    /* shift the larger keys up to make room for the new one */
+    memmove(b->keys + i + 1, b->keys + i, sizeof(SkiplistKey) * (b->used - i));
+    memmove(b->counts + i + 1, b->counts + i, sizeof(uint32_t) * (b->used - i));
+    b->keys[i] = key;
+    b->counts[i] = 1;
+    b->used++;
+
+    return steps + 1;
+}
+
+int
+unrolledSkiplistDelete(UnrolledSkiplist s, SkiplistKey key)
+{
+    struct unrolledBlock *update[MAX_HEIGHT], *b, *next;
+    int steps = 0, i;
+
+    b = findPath(s, key, 1, update, &steps);
+
+    if(b == s->head) {
+        return 0;
+    }
+
+    for(i = 0; i < b->used && b->keys[i] < key; i++);
+
+    if(i == b->used || b->keys[i] != key) {
+        return 0;
+    }
+
+    if(--b->counts[i] > 0) {
+        return 1;
+    }
+
+    if(b->used == 1) {
+        /* the predecessors of b are the last blocks that start before it */
+        findPath(s, key, 0, update, &steps);
+        removeBlock(s, b, update);
+        return 1;
+    }
+
+    memmove(b->keys + i, b->keys + i + 1, sizeof(SkiplistKey) * (b->used - i - 1));
+    memmove(b->counts + i, b->counts + i + 1, sizeof(uint32_t) * (b->used - i - 1));
+    b->used--;
+
+    /* merge a block that's less than half full with the next one, when they fit into one */
+    next = b->next[0];
+
+    if(b->used < B / 2 && next && b->used + next->used <= B) {
+        memcpy(b->keys + b->used, next->keys, sizeof(SkiplistKey) * next->used);
+        memcpy(b->counts + b->used, next->counts, sizeof(uint32_t) * next->used);
+        b->used += next->used;
+
+        findPath(s, next->keys[0], 0, update, &steps);
+        removeBlock(s, next, update);
+    }
+
+    return 1;
+}
+
+void
+unrolledSkiplistPrint(UnrolledSkiplist s)
+{
+    struct unrolledBlock *b;
+    int level, i;
+
+    /* the towers are labelled by the first key of their block */
+    for(level = s->head->height - 1; level > 0; --level) {
+        printf("%d: ", level);
+
+        for(b = s->head->next[level]; b; b = b->next[level]) {
+            printf("%" PRId64 " ", b->keys[0]);
+        }
+
+        printf("\n");
+    }
+
+    printf("0: ");
+
+    for(b = s->head->next[0]; b; b = b->next[0]) {
+        printf("[");
+
+        for(i = 0; i < b->used; i++) {
+            printf(i ? " %" PRId64 : "%" PRId64, b->keys[i]);
+        }
+
+        printf("] ");
+    }
+
+    printf("\n");
+}
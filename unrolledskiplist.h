@@ -0,0 +1,78 @@
+//
+// Unrolled skiplist, whose nodes hold a small sorted block of keys
+//
+
+#ifndef CFASTSORT_UNROLLEDSKIPLIST_H
+#define CFASTSORT_UNROLLEDSKIPLIST_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+#include "skiplist.h"
+#include "skiplistinternal.h"
+
+/* number of keys in a block, 8 keys fill one cache line */
+#define UNROLLED_BLOCK_KEYS 8
+
+/* largest count of a key, the counts are 32-bit to keep the blocks small */
+#define UNROLLED_MAX_COUNT UINT32_MAX
+
+/* alignment of the blocks, which start on a cache line */
+#define UNROLLED_BLOCK_ALIGN 64
+
+/* A block of keys at the bottom level of the list, kept sorted, with the count
+ * of every key. The towers index the blocks by their first key, so a search
+ * only chases pointers down to the right block and then scans it linearly.
+ *
+ * The keys fill the first cache line of a block, and the counts, the sizes and
+ * the first 3 next pointers fill the second, so the 7 in 8 blocks no taller
+ * than 3 take exactly two cache lines.
+ */
+struct unrolledBlock {
+    SkiplistKey keys[UNROLLED_BLOCK_KEYS];
+    uint32_t counts[UNROLLED_BLOCK_KEYS];
+    int used;                       /* number of keys in the block */
+    int height;                     /* number of next pointers */
+    struct unrolledBlock *next[1];  /* first of many */
+};
+
+struct unrolledSkiplist {
+    struct skiplistRandom random;                      /* generator of the tower heights */
+    struct skiplistArena arena;                        /* slabs the blocks are carved out of */
+    struct unrolledBlock *freed[SKIPLIST_MAX_HEIGHT];  /* removed blocks to reuse, by height, chained through next[0] */
+    size_t blocks;                                     /* number of blocks, not counting the head */
+    struct unrolledBlock *head;                        /* empty block with room for every level, as tall as the list */
+};
+
+typedef struct unrolledSkiplist * UnrolledSkiplist;
+
+/* create an empty unrolled skiplist, or return NULL if out of memory */
+UnrolledSkiplist unrolledSkiplistCreate(void);
+
+/* destroy an unrolled skiplist along with all of its blocks */
+void unrolledSkiplistDestroy(UnrolledSkiplist s);
+
+/** Increment the count of key if it's found, otherwise insert it into its block.
+ * A full block first hands its largest key over to the next block if that one
+ * has room, and is split in two otherwise.
+ *
+ * @param s Unrolled skiplist to be operated on
+ * @param key Value of the key to be inserted or incremented
+ * @return The number of steps performed in total, or -1 if out of memory or
+ * if key has already been inserted UNROLLED_MAX_COUNT times
+ */
+int unrolledSkiplistSafeInsert(UnrolledSkiplist s, SkiplistKey key);
+
+/** Decrement the count of key, removing it once it drops to 0. A block left
+ * less than half full is merged with the next block when their keys fit in one.
+ *
+ * @param s Unrolled skiplist to be operated on
+ * @param key Value of the key to be removed
+ * @return 1 if key was found, 0 otherwise
+ */
+int unrolledSkiplistDelete(UnrolledSkiplist s, SkiplistKey key);
+
+/* print out the blocks of s in a tower-like form */
+void unrolledSkiplistPrint(UnrolledSkiplist s);
+
+#endif //CFASTSORT_UNROLLEDSKIPLIST_H